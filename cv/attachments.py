@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from cloudinary_storage.storage import MediaCloudinaryStorage
+
+from .disk_cache import DiskCache
+
+_lock = threading.Lock()
+_session = None
+_executor = None
+
+FETCH_TIMEOUT = 25
+CHUNK_SIZE = 64 * 1024
+
+# Motivos por los que un adjunto no entra en el PDF
+SKIPPED_TIMEOUT = "Tiempo agotado"
+SKIPPED_ERROR = "No se pudo leer el archivo"
+SKIPPED_INVALID = "El PDF está dañado"
+
+
+# =========================
+# SESIÓN HTTP COMPARTIDA (KEEP-ALIVE)
+# =========================
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            per_host = settings.CV_PDF_FETCH_PER_HOST
+            adapter = HTTPAdapter(pool_maxsize=per_host, pool_block=True)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CV_PDF_FETCH_CONCURRENCY,
+                thread_name_prefix="cv-adjuntos",
+            )
+        return _executor
+
+
+# =========================
+# CACHE EN DISCO DE CERTIFICADOS
+# =========================
+# El contenido va tal cual (para poder abrirlo con PdfReader sin copiarlo)
+# y los validadores HTTP en un archivo "<clave>.meta" al lado. Ambos se
+# escriben de forma atómica; si quedan desparejados, lo peor que pasa es
+# una revalidación que descarga el archivo completo.
+def _attachment_cache():
+    return DiskCache(
+        Path(settings.CV_CACHE_DIR) / "adjuntos",
+        settings.CV_ATTACHMENT_CACHE_MAX_BYTES,
+    )
+
+
+def _download(url, timeout):
+    cache = _attachment_cache()
+    key = hashlib.sha256(url.encode()).hexdigest()
+    meta_key = key + ".meta"
+
+    headers = {}
+    raw_meta = cache.get(meta_key)
+    meta = json.loads(raw_meta) if raw_meta is not None else None
+    if meta is not None and cache.path(key).exists():
+        if time.time() - meta["fetched"] < settings.CV_ATTACHMENT_CACHE_FRESH:
+            f = cache.open(key)
+            if f is not None:
+                return f
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    with get_session().get(url, timeout=timeout, headers=headers, stream=True) as resp:
+        if resp.status_code == 304 and headers:
+            f = cache.open(key)
+            if f is not None:
+                meta["fetched"] = time.time()
+                cache.put(meta_key, json.dumps(meta).encode())
+                return f
+            # El cuerpo fue expulsado entre tanto: se pide completo
+            return _download_full(cache, key, url, timeout)
+
+        return _store_response(cache, key, resp)
+
+
+def _download_full(cache, key, url, timeout):
+    with get_session().get(url, timeout=timeout, stream=True) as resp:
+        return _store_response(cache, key, resp)
+
+
+def _store_response(cache, key, resp):
+    resp.raise_for_status()
+    meta = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "fetched": time.time(),
+    }
+    # Se vuelca al cache por bloques mientras se descarga
+    cache.put_chunks(key, resp.iter_content(CHUNK_SIZE))
+    cache.put(key + ".meta", json.dumps(meta).encode())
+    return cache.open(key)
+
+
+# =========================
+# LECTURA DE ADJUNTOS
+# =========================
+def _timeout(deadline):
+    if deadline is None:
+        return FETCH_TIMEOUT
+    return min(FETCH_TIMEOUT, deadline - time.monotonic())
+
+
+def _is_empty(f):
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size == 0
+
+
+def open_file(file_field, timeout=FETCH_TIMEOUT):
+    """
+    Devuelve un archivo binario abierto (el llamador lo cierra) o None.
+    Cada backend va por su camino más corto: disco local sin pasar por
+    HTTP, Cloudinary con descarga en streaming al cache, el resto vía
+    storage.open. Nada se carga entero en memoria.
+    """
+    if not file_field:
+        return None
+    storage = file_field.storage
+    f = None
+    try:
+        if isinstance(storage, FileSystemStorage):
+            f = open(storage.path(file_field.name), "rb")
+        elif isinstance(storage, MediaCloudinaryStorage):
+            f = _download(file_field.url, timeout)
+        else:
+            f = storage.open(file_field.name, "rb")
+        if f is None or _is_empty(f):
+            close_quietly(f)
+            return None
+        return f
+    except Exception:
+        close_quietly(f)
+        return None
+
+
+def close_quietly(f):
+    if f is None:
+        return
+    try:
+        f.close()
+    except Exception:
+        pass
+
+
+def _close_result(fut):
+    if not fut.cancelled():
+        close_quietly(fut.result()[0])
+
+
+def _fetch(file_field, deadline):
+    timeout = _timeout(deadline)
+    if timeout <= 0:
+        return None, SKIPPED_TIMEOUT
+    f = open_file(file_field, timeout)
+    if f is not None:
+        return f, None
+    if deadline is not None and time.monotonic() >= deadline:
+        return None, SKIPPED_TIMEOUT
+    return None, SKIPPED_ERROR
+
+
+def fetch_all(file_fields, deadline=None):
+    """
+    Abre los adjuntos en paralelo y devuelve una lista de
+    (archivo, motivo) en el mismo orden de entrada, así _merge_pdfs recibe
+    las secciones en orden. Lo que no termina antes de `deadline`
+    (time.monotonic) se abandona con motivo SKIPPED_TIMEOUT.
+    """
+    executor = _get_executor()
+    futures = [executor.submit(_fetch, f, deadline) for f in file_fields]
+
+    remaining = None if deadline is None else max(0, deadline - time.monotonic())
+    wait(futures, timeout=remaining)
+
+    results = []
+    for fut in futures:
+        if fut.done():
+            results.append(fut.result())
+        else:
+            # Si llega tarde, el archivo se cierra al terminar
+            fut.cancel()
+            fut.add_done_callback(_close_result)
+            results.append((None, SKIPPED_TIMEOUT))
+    return results
+
+
+def _close_file(fut):
+    if not fut.cancelled():
+        close_quietly(fut.result())
+
+
+def iter_open(file_fields, window=None):
+    """
+    Abre los archivos en paralelo, con hasta `window` adelantados, y los
+    entrega en orden (archivo o None) a medida que llegan. El llamador
+    cierra cada archivo; lo pendiente se cierra si se abandona el generador.
+    """
+    window = window or settings.CV_PDF_FETCH_CONCURRENCY
+    executor = _get_executor()
+    pending = deque()
+    try:
+        for field in file_fields:
+            pending.append(executor.submit(open_file, field))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+            fut.add_done_callback(_close_file)
@@ -0,0 +1,232 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.fields.files import FieldFile
+from django.utils.text import slugify
+
+from PyPDF2 import PdfReader
+
+from .attachments import iter_open
+from .models import (
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+)
+from .pdf_optimize import linearize
+from .versions import get_version
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Tipo en la URL -> (modelo, campo de la clave primaria)
+TIPOS = {
+    "curso": (Cursosrealizados, "idcursorealizado"),
+    "experiencia": (Experiencialaboral, "idexperiencialaboral"),
+    "reconocimiento": (Reconocimientos, "idreconocimiento"),
+    "prod_acad": (Productosacademicos, "idproductoacademico"),
+    "prod_lab": (Productoslaborales, "idproductolaboral"),
+}
+
+# (tipo, id) -> (versión del modelo, (nombre en el storage, hash) o None), por proceso
+MAX_REFS = 1024
+_refs = OrderedDict()
+_refs_lock = threading.Lock()
+
+
+def _metadatos(archivo):
+    # Hash y tamaño leyendo por bloques; páginas con PdfReader (0 si no se puede leer)
+    archivo.seek(0)
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: archivo.read(CHUNK_SIZE), b""):
+        sha.update(chunk)
+        size += len(chunk)
+
+    archivo.seek(0)
+    try:
+        paginas = len(PdfReader(archivo).pages)
+    except Exception:
+        paginas = 0
+    archivo.seek(0)
+    return paginas, size, sha.hexdigest()
+
+
+def _optimizar(archivo):
+    # Copia linealizada (pdf_optimize.linearize): qpdf además comprime con
+    # Flate los flujos que llegan sin filtro. Se pasa una copia en memoria
+    # porque linearize cierra el archivo que recibe.
+    archivo.seek(0)
+    data = io.BytesIO(archivo.read())
+    archivo.seek(0)
+    with linearize(data) as f:
+        return f.read()
+
+
+# =========================
+# PROCESAMIENTO AL SUBIR
+# =========================
+def procesar_certificado(instance, optimizar=None):
+    """
+    Rellena páginas, tamaño y hash del certificado_pdf de `instance` (sin
+    guardarla). Si CV_CERTIFICADO_OPTIMIZAR está activo guarda además una
+    copia comprimida y linealizada en certificado_pdf_optimizado.
+    """
+    if optimizar is None:
+        optimizar = settings.CV_CERTIFICADO_OPTIMIZAR
+
+    archivo = instance.certificado_pdf
+    if instance.certificado_pdf_optimizado:
+        instance.certificado_pdf_optimizado.delete(save=False)
+
+    if not archivo:
+        instance.certificado_paginas = None
+        instance.certificado_bytes = None
+        instance.certificado_hash = None
+        return
+
+    # Un archivo recién subido sigue abierto para que Django lo guarde después
+    subido = not archivo._committed
+    archivo.open("rb")
+    try:
+        paginas, size, sha = _metadatos(archivo)
+        instance.certificado_paginas = paginas
+        instance.certificado_bytes = size
+        instance.certificado_hash = sha
+
+        if optimizar and paginas:
+            try:
+                data = _optimizar(archivo)
+            except Exception:
+                logger.exception("No se pudo optimizar el certificado %s", archivo.name)
+                data = None
+            if data and len(data) < size:
+                instance.certificado_pdf_optimizado.save(
+                    os.path.basename(archivo.name), ContentFile(data), save=False
+                )
+    finally:
+        if subido:
+            archivo.seek(0)
+        else:
+            archivo.close()
+
+
+# =========================
+# BÚSQUEDA SIN BASE DE DATOS
+# =========================
+def find_certificado(tipo, obj_id):
+    """
+    Devuelve (FieldFile, hash) del certificado_pdf, o None si el registro no
+    existe. Los clics repetidos se resuelven en memoria mientras el sello de
+    versión del modelo no cambie (cualquier save/delete lo cambia).
+    """
+    model, pk_field = TIPOS[tipo]
+    version = get_version(model._meta.model_name)
+    ref_key = (tipo, obj_id)
+
+    with _refs_lock:
+        entry = _refs.get(ref_key)
+        if entry is not None and entry[0] == version:
+            _refs.move_to_end(ref_key)
+        else:
+            entry = None
+
+    if entry is None:
+        row = (
+            model.objects.filter(**{pk_field: obj_id})
+            .values_list("certificado_pdf", "certificado_hash")
+            .first()
+        )
+        entry = (version, row)
+        with _refs_lock:
+            _refs[ref_key] = entry
+            while len(_refs) > MAX_REFS:
+                _refs.popitem(last=False)
+
+    row = entry[1]
+    if row is None:
+        return None
+    name, sha = row
+    return FieldFile(None, model._meta.get_field("certificado_pdf"), name), sha
+
+
+# =========================
+# ZIP CON TODOS LOS CERTIFICADOS
+# =========================
+# Carpeta en el ZIP, relación del perfil y campo que da nombre al archivo
+ZIP_SECCIONES = (
+    ("experiencia", "experiencias", "nombrempresa"),
+    ("cursos", "cursos", "nombrecurso"),
+    ("reconocimientos", "reconocimientos", "tiporeconocimiento"),
+    ("productos_academicos", "productos_academicos", "nombreproducto"),
+    ("productos_laborales", "productos_laborales", "nombreproducto"),
+)
+
+
+def zip_entries(perfil):
+    # [(nombre dentro del ZIP, FieldFile)] de los ítems visibles
+    entries = []
+    for carpeta, related, campo in ZIP_SECCIONES:
+        for x in getattr(perfil, related).filter(activarparaqueseveaenfront=True):
+            base = f"{carpeta}/{slugify(getattr(x, campo))[:60] or 'certificado'}-{x.pk}"
+            if x.certificado_pdf:
+                entries.append((f"{base}.pdf", x.certificado_pdf))
+            if x.certificado_imagen:
+                ext = os.path.splitext(x.certificado_imagen.name)[1].lower() or ".jpg"
+                entries.append((f"{base}-imagen{ext}", x.certificado_imagen))
+    return entries
+
+
+class _Pipe:
+    # Destino sin seek para ZipFile: junta lo escrito hasta que se entrega
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def iter_zip(entries):
+    """
+    Genera el ZIP por partes mientras los archivos se descargan en paralelo.
+    En memoria solo hay un bloque a la vez. Los que no se pudieron leer se
+    listan en omitidos.txt al final.
+    """
+    pipe = _Pipe()
+    omitidos = []
+    files = iter_open([field for _name, field in entries])
+    try:
+        # Sin seek, zipfile escribe cada tamaño en un descriptor tras los datos
+        with zipfile.ZipFile(pipe, "w", zipfile.ZIP_STORED) as zf:
+            for (name, _field), f in zip(entries, files):
+                if f is None:
+                    omitidos.append(name)
+                    continue
+                with f, zf.open(name, "w") as dest:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        dest.write(chunk)
+                        yield from pipe.drain()
+                yield from pipe.drain()
+
+            if omitidos:
+                zf.writestr("omitidos.txt", "No se pudieron leer:\n" + "\n".join(omitidos) + "\n")
+        yield from pipe.drain()
+    finally:
+        files.close()
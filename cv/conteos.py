@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import perfil_activo
+from .models import (
+    Datospersonales,
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+    Ventagarage,
+)
+from .read_model import rebuild
+from .versions import SELLO_CONTEOS, bump_version
+
+# Modelo hijo -> columna de Datospersonales con sus ítems visibles
+CONTEOS = {
+    Cursosrealizados: "conteo_cursos",
+    Experiencialaboral: "conteo_experiencias",
+    Reconocimientos: "conteo_reconoc",
+    Productosacademicos: "conteo_prod_acad",
+    Productoslaborales: "conteo_prod_lab",
+    Ventagarage: "conteo_venta",
+}
+
+
+def _visibles(model):
+    # COUNT(*) de los visibles del perfil de la fila externa; 0 si no hay
+    subquery = (
+        model.objects.filter(perfil=OuterRef("pk"), activarparaqueseveaenfront=True)
+        .order_by()
+        .values("perfil")
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    return Coalesce(Subquery(subquery), Value(0))
+
+
+def _perfil_cambiado():
+    # El perfil cacheado lleva los conteos: se descarta aquí y, con su propio
+    # sello, en los demás workers. El de datospersonales no cambia, así la
+    # barra lateral del PDF no se regenera al editar un curso.
+    perfil_activo.clear()
+    transaction.on_commit(lambda: bump_version(SELLO_CONTEOS))
+
+
+# =========================
+# MANTENIMIENTO
+# =========================
+def actualizar_conteo(model, *perfil_ids):
+    """
+    Recalcula la columna de `model` para esos perfiles en un solo UPDATE
+    con subconsulta, dentro de la transacción del save/delete que lo pide.
+    """
+    perfil_ids = [pk for pk in perfil_ids if pk is not None]
+    if not perfil_ids:
+        return
+    Datospersonales.objects.filter(pk__in=perfil_ids).update(**{CONTEOS[model]: _visibles(model)})
+    _perfil_cambiado()
+
+
+@transaction.atomic
+def recontar(perfiles=None):
+    # Las seis columnas de todos los perfiles (o de `perfiles`) en una
+    # consulta, y sus documentos de lectura, de donde las lee el dashboard
+    qs = Datospersonales.objects.all() if perfiles is None else perfiles
+    perfil_ids = list(qs.values_list("pk", flat=True))
+    updated = Datospersonales.objects.filter(pk__in=perfil_ids).update(
+        **{campo: _visibles(model) for model, campo in CONTEOS.items()}
+    )
+    for perfil_id in perfil_ids:
+        rebuild(perfil_id)
+    _perfil_cambiado()
+    return updated
@@ -0,0 +1,135 @@
+import fcntl
+import os
+import tempfile
+from pathlib import Path
+
+
+# =========================
+# ESCRITURA ATÓMICA
+# =========================
+def atomic_write(path, data):
+    # Se escribe en un temporal del mismo directorio y se renombra: otro
+    # worker nunca ve un archivo a medio escribir.
+    atomic_write_chunks(path, [data])
+
+
+def atomic_write_chunks(path, chunks):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# =========================
+# CANDADOS ENTRE PROCESOS (flock)
+# =========================
+def try_flock(path):
+    # Devuelve el descriptor con el candado tomado, o None si otro lo tiene
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def release_flock(fd):
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+# =========================
+# CACHE EN DISCO (LRU POR TAMAÑO)
+# =========================
+class DiskCache:
+    """
+    Blobs en un directorio compartido por todos los workers del host.
+    El mtime hace de marca LRU: cada lectura lo actualiza y la expulsión
+    borra primero los más antiguos hasta quedar bajo max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        p = self.path(key)
+        try:
+            with open(p, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self.touch(key)
+        return data
+
+    def open(self, key):
+        # En POSIX el archivo abierto sigue siendo legible aunque otro
+        # worker lo expulse después.
+        try:
+            f = open(self.path(key), "rb")
+        except FileNotFoundError:
+            return None
+        self.touch(key)
+        return f
+
+    def touch(self, key):
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+
+    def put(self, key, data):
+        atomic_write(self.path(key), data)
+        self.evict(keep=key)
+
+    def put_chunks(self, key, chunks):
+        atomic_write_chunks(self.path(key), chunks)
+        self.evict(keep=key)
+
+    def delete(self, key):
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        for p in self.directory.glob("*/*"):
+            if p.name.startswith(".tmp-"):
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _mtime, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            if p.name == keep:
+                continue
+            try:
+                os.unlink(p)
+            except FileNotFoundError:
+                pass
+            total -= size
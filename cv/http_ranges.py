@@ -0,0 +1,117 @@
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _size(f):
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+
+def _parse_range(header, size):
+    # Solo un rango; con varios se responde el archivo completo
+    m = RANGE_RE.match(header.strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    start, end = m.group(1), m.group(2)
+    if not start:
+        # "bytes=-N": los últimos N bytes
+        length = int(end)
+        if length == 0:
+            return ()
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        # "bytes=500-100" no es un rango válido: se ignora (RFC 9110, 14.2)
+        return None
+    if start >= size:
+        return ()
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def _iter_range(f, start, end):
+    try:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def not_modified(request, etag):
+    # 304 si el cliente ya tiene esta versión; None si hay que enviarla
+    if not etag:
+        return None
+    quoted = f'"{etag}"'
+    if quoted in request.headers.get("If-None-Match", ""):
+        response = HttpResponse(status=304)
+        response["ETag"] = quoted
+        return response
+    return None
+
+
+# =========================
+# RESPUESTA CON SOPORTE DE RANGOS
+# =========================
+def ranged_file_response(request, f, content_type, filename, etag=None):
+    """
+    Como FileResponse (inline), pero atiende "Range: bytes=a-b" con 206 y
+    responde 304 a If-None-Match. Sin etag no se aceptan rangos: el cliente
+    no podría saber si las partes son del mismo archivo.
+    """
+    quoted = f'"{etag}"' if etag else None
+
+    response = not_modified(request, etag)
+    if response is not None:
+        f.close()
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if quoted and range_header and (not if_range or if_range == quoted):
+        size = _size(f)
+        byte_range = _parse_range(range_header, size)
+
+    if byte_range == ():
+        f.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_iter_range(f, start, end), status=206, content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    else:
+        response = FileResponse(f, content_type=content_type, filename=filename)
+
+    if quoted:
+        response["ETag"] = quoted
+        response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def file_etag(f):
+    # Los archivos del cache se llaman como su clave: sirve de ETag fuerte.
+    # Los temporales ya borrados no tienen un nombre estable.
+    name = getattr(f, "name", None)
+    if isinstance(name, str) and os.path.exists(name):
+        return os.path.basename(name)
+    return None
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from cv.certificados import procesar_certificado
+from cv.models import (
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+)
+
+MODELOS = (
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+)
+
+CAMPOS = ("certificado_paginas", "certificado_bytes", "certificado_hash", "certificado_pdf_optimizado")
+
+
+class Command(BaseCommand):
+    help = "Calcula páginas, tamaño y hash de los certificados PDF ya subidos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todos", action="store_true", help="Reprocesa también los que ya tienen hash.")
+        parser.add_argument("--optimizar", action="store_true", help="Guarda la copia comprimida y linealizada aunque esté desactivada.")
+
+    def handle(self, *args, **options):
+        for model in MODELOS:
+            qs = model.objects.exclude(certificado_pdf="").exclude(certificado_pdf__isnull=True)
+            if not options["todos"]:
+                qs = qs.filter(certificado_hash__isnull=True)
+
+            for obj in qs.iterator():
+                try:
+                    procesar_certificado(obj, optimizar=options["optimizar"] or None)
+                except Exception as e:
+                    self.stderr.write(f"{model.__name__} {obj.pk}: {e}")
+                    continue
+                obj.save(update_fields=CAMPOS)
+                if not obj.certificado_paginas:
+                    self.stderr.write(f"{model.__name__} {obj.pk}: el PDF está dañado o no tiene páginas")
+
+            self.stdout.write(f"{model.__name__}: listo")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cv.conteos import recontar
+
+
+class Command(BaseCommand):
+    help = "Recalcula los conteos de ítems visibles de cada perfil."
+
+    def handle(self, *args, **options):
+        updated = recontar()
+        self.stdout.write(f"Perfiles actualizados: {updated}")
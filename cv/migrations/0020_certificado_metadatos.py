@@ -0,0 +1,140 @@
+# Generated by Django 4.2.11 on 2026-10-17 01:54
+
+import cv.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0019_remove_cursosrealizados_uq_curso_perfil_nombre_fechas_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cursosrealizados',
+            name='certificado_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cursosrealizados',
+            name='certificado_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='cursosrealizados',
+            name='certificado_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cursosrealizados',
+            name='certificado_pdf_optimizado',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='certificados/optimizados/'),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificado_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificado_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificado_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificado_pdf_optimizado',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='certificados/optimizados/'),
+        ),
+        migrations.AddField(
+            model_name='productosacademicos',
+            name='certificado_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productosacademicos',
+            name='certificado_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='productosacademicos',
+            name='certificado_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productosacademicos',
+            name='certificado_pdf_optimizado',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='certificados/optimizados/'),
+        ),
+        migrations.AddField(
+            model_name='productoslaborales',
+            name='certificado_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productoslaborales',
+            name='certificado_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='productoslaborales',
+            name='certificado_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productoslaborales',
+            name='certificado_pdf_optimizado',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='certificados/optimizados/'),
+        ),
+        migrations.AddField(
+            model_name='reconocimientos',
+            name='certificado_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimientos',
+            name='certificado_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimientos',
+            name='certificado_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimientos',
+            name='certificado_pdf_optimizado',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='certificados/optimizados/'),
+        ),
+        migrations.AlterField(
+            model_name='cursosrealizados',
+            name='certificado_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/', validators=[cv.models.validar_pdf, django.core.validators.FileExtensionValidator(['pdf']), cv.models.validar_pdf_legible]),
+        ),
+        migrations.AlterField(
+            model_name='experiencialaboral',
+            name='certificado_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/', validators=[cv.models.validar_pdf, django.core.validators.FileExtensionValidator(['pdf']), cv.models.validar_pdf_legible]),
+        ),
+        migrations.AlterField(
+            model_name='productosacademicos',
+            name='certificado_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/', validators=[cv.models.validar_pdf, django.core.validators.FileExtensionValidator(['pdf']), cv.models.validar_pdf_legible]),
+        ),
+        migrations.AlterField(
+            model_name='productoslaborales',
+            name='certificado_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/', validators=[cv.models.validar_pdf, django.core.validators.FileExtensionValidator(['pdf']), cv.models.validar_pdf_legible]),
+        ),
+        migrations.AlterField(
+            model_name='reconocimientos',
+            name='certificado_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/', validators=[cv.models.validar_pdf, django.core.validators.FileExtensionValidator(['pdf']), cv.models.validar_pdf_legible]),
+        ),
+    ]
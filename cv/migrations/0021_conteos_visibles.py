@@ -0,0 +1,71 @@
+# Generated by Django 4.2.11 on 2026-10-17 02:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+CONTEOS = {
+    "cursosrealizados": "conteo_cursos",
+    "experiencialaboral": "conteo_experiencias",
+    "reconocimientos": "conteo_reconoc",
+    "productosacademicos": "conteo_prod_acad",
+    "productoslaborales": "conteo_prod_lab",
+    "ventagarage": "conteo_venta",
+}
+
+
+def recontar(apps, schema_editor):
+    Datospersonales = apps.get_model("cv", "Datospersonales")
+    valores = {}
+    for model_name, campo in CONTEOS.items():
+        model = apps.get_model("cv", model_name)
+        subquery = (
+            model.objects.filter(perfil=OuterRef("pk"), activarparaqueseveaenfront=True)
+            .order_by()
+            .values("perfil")
+            .annotate(n=Count("*"))
+            .values("n")
+        )
+        valores[campo] = Coalesce(Subquery(subquery), Value(0))
+    Datospersonales.objects.update(**valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0020_certificado_metadatos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datospersonales',
+            name='conteo_cursos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datospersonales',
+            name='conteo_experiencias',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datospersonales',
+            name='conteo_prod_acad',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datospersonales',
+            name='conteo_prod_lab',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datospersonales',
+            name='conteo_reconoc',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='datospersonales',
+            name='conteo_venta',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recontar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-17 02:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0021_conteos_visibles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Documentoperfil',
+            fields=[
+                ('perfil', models.OneToOneField(db_column='idperfil', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento', serialize=False, to='cv.datospersonales')),
+                ('datos', models.JSONField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'DOCUMENTOPERFIL',
+            },
+        ),
+    ]
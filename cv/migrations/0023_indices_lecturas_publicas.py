@@ -0,0 +1,72 @@
+# Generated by Django 4.2.11 on 2026-10-17 02:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0022_documentoperfil'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cursosrealizados',
+            name='perfil',
+            field=models.ForeignKey(db_column='idperfilconqueestaactivo', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cursos', to='cv.datospersonales'),
+        ),
+        migrations.AlterField(
+            model_name='experiencialaboral',
+            name='perfil',
+            field=models.ForeignKey(db_column='idperfilconqueestaactivo', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='experiencias', to='cv.datospersonales'),
+        ),
+        migrations.AlterField(
+            model_name='productosacademicos',
+            name='perfil',
+            field=models.ForeignKey(db_column='idperfilconqueestaactivo', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='productos_academicos', to='cv.datospersonales'),
+        ),
+        migrations.AlterField(
+            model_name='productoslaborales',
+            name='perfil',
+            field=models.ForeignKey(db_column='idperfilconqueestaactivo', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='productos_laborales', to='cv.datospersonales'),
+        ),
+        migrations.AlterField(
+            model_name='reconocimientos',
+            name='perfil',
+            field=models.ForeignKey(db_column='idperfilconqueestaactivo', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reconocimientos', to='cv.datospersonales'),
+        ),
+        migrations.AlterField(
+            model_name='ventagarage',
+            name='perfil',
+            field=models.ForeignKey(db_column='idperfilconqueestaactivo', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='venta_garage', to='cv.datospersonales'),
+        ),
+        migrations.AddIndex(
+            model_name='cursosrealizados',
+            index=models.Index(fields=['perfil', 'fechainicio', 'idcursorealizado', 'activarparaqueseveaenfront'], name='cursos_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datospersonales',
+            index=models.Index(condition=models.Q(('perfilactivo', True)), fields=['-idperfil'], name='perfil_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experiencialaboral',
+            index=models.Index(fields=['perfil', 'fechainicio', 'idexperiencialaboral', 'activarparaqueseveaenfront'], name='exp_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productosacademicos',
+            index=models.Index(fields=['perfil', 'idproductoacademico', 'activarparaqueseveaenfront'], name='prodacad_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoslaborales',
+            index=models.Index(fields=['perfil', 'fechaproducto', 'idproductolaboral', 'activarparaqueseveaenfront'], name='prodlab_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reconocimientos',
+            index=models.Index(fields=['perfil', 'fechareconocimiento', 'idreconocimiento', 'activarparaqueseveaenfront'], name='reconoc_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(fields=['perfil', 'fecha', 'idventagarage', 'activarparaqueseveaenfront'], name='venta_perfil_visible_idx'),
+        ),
+    ]
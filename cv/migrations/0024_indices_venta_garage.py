@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0023_indices_lecturas_publicas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(fields=['estadoproducto', 'perfil', 'fecha'], name='venta_estado_perfil_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(fields=['valordelbien', 'perfil'], name='venta_precio_perfil_idx'),
+        ),
+    ]
@@ -9,7 +9,7 @@ from django.core.validators import (
     MaxValueValidator,
     EmailValidator,
 )
-from django.db import models
+from django.db import models, transaction
 
 from cloudinary_storage.storage import RawMediaCloudinaryStorage
 
@@ -51,6 +51,23 @@ def validar_pdf(archivo):
         raise ValidationError("Solo se permiten archivos PDF.")
 
 
+def validar_pdf_legible(archivo):
+    # Solo archivos recién subidos: los ya guardados se validaron al subirlos
+    if not archivo or getattr(archivo, "_committed", True):
+        return
+    from PyPDF2 import PdfReader
+
+    try:
+        archivo.seek(0)
+        paginas = len(PdfReader(archivo).pages)
+    except Exception:
+        paginas = 0
+    finally:
+        archivo.seek(0)
+    if not paginas:
+        raise ValidationError("El PDF está dañado o no tiene páginas.")
+
+
 def validar_rango_inicio_fin(inicio, fin, field_fin="fechafin"):
     if inicio and fin and fin < inicio:
         raise ValidationError({field_fin: "La fecha fin no puede ser menor que la fecha inicio."})
@@ -137,13 +154,32 @@ class Datospersonales(models.Model):
 
     sitioweb = models.URLField(blank=True, null=True)
 
+    # Ítems visibles por sección; los mantiene cv/conteos.py
+    conteo_cursos = models.PositiveIntegerField(default=0, editable=False)
+    conteo_experiencias = models.PositiveIntegerField(default=0, editable=False)
+    conteo_reconoc = models.PositiveIntegerField(default=0, editable=False)
+    conteo_prod_acad = models.PositiveIntegerField(default=0, editable=False)
+    conteo_prod_lab = models.PositiveIntegerField(default=0, editable=False)
+    conteo_venta = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         db_table = "DATOSPERSONALES"
+        # Solo las filas con perfilactivo: el perfil activo sale sin recorrer la tabla
+        indexes = [
+            models.Index(
+                fields=["-idperfil"],
+                condition=models.Q(perfilactivo=True),
+                name="perfil_activo_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.perfilactivo:
-            Datospersonales.objects.exclude(pk=self.pk).update(perfilactivo=False)
+        # En una transacción: el sello de versión (on_commit en signals.py)
+        # cambia después de desactivar los demás perfiles
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.perfilactivo:
+                Datospersonales.objects.exclude(pk=self.pk).update(perfilactivo=False)
 
     def __str__(self):
         return f"{self.nombres} {self.apellidos}"
@@ -157,7 +193,18 @@ class CertificadoMixin(models.Model):
         upload_to="certificados/",
         blank=True,
         null=True,
-        validators=[validar_pdf, FileExtensionValidator(["pdf"])],
+        validators=[validar_pdf, FileExtensionValidator(["pdf"]), validar_pdf_legible],
+    )
+
+    # Se calculan al subir el PDF (ver cv/certificados.py)
+    certificado_paginas = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    certificado_bytes = models.PositiveBigIntegerField(blank=True, null=True, editable=False)
+    certificado_hash = models.CharField(max_length=64, blank=True, null=True, editable=False)
+    certificado_pdf_optimizado = models.FileField(
+        upload_to="certificados/optimizados/",
+        blank=True,
+        null=True,
+        editable=False,
     )
 
     certificado_imagen = models.ImageField(
@@ -182,6 +229,7 @@ class Cursosrealizados(CertificadoMixin, models.Model):
         on_delete=models.CASCADE,
         related_name="cursos",
         db_column="idperfilconqueestaactivo",
+        db_index=False,  # lo cubre el índice compuesto de Meta.indexes
     )
 
     nombrecurso = models.CharField(max_length=120)
@@ -201,6 +249,16 @@ class Cursosrealizados(CertificadoMixin, models.Model):
 
     class Meta:
         db_table = "CURSOSREALIZADOS"
+        # Lecturas públicas: ítems visibles del perfil en el orden de la página
+        # (fecha, id), así el listado y el cursor salen del índice sin ordenar.
+        # La marca de visible va al final: WHERE "activar..." no es una
+        # igualdad para SQLite y, delante de la fecha, obligaría a ordenar.
+        indexes = [
+            models.Index(
+                fields=["perfil", "fechainicio", "idcursorealizado", "activarparaqueseveaenfront"],
+                name="cursos_perfil_visible_idx",
+            ),
+        ]
 
     def clean(self):
         validar_inicio_fin_obligatorios_juntos(self.fechainicio, self.fechafin)
@@ -220,6 +278,7 @@ class Experiencialaboral(CertificadoMixin, models.Model):
         on_delete=models.CASCADE,
         related_name="experiencias",
         db_column="idperfilconqueestaactivo",
+        db_index=False,  # lo cubre el índice compuesto de Meta.indexes
     )
 
     nombrempresa = models.CharField(max_length=120)
@@ -238,6 +297,13 @@ class Experiencialaboral(CertificadoMixin, models.Model):
 
     class Meta:
         db_table = "EXPERIENCIALABORAL"
+        # Lecturas públicas: como en Cursosrealizados
+        indexes = [
+            models.Index(
+                fields=["perfil", "fechainicio", "idexperiencialaboral", "activarparaqueseveaenfront"],
+                name="exp_perfil_visible_idx",
+            ),
+        ]
 
 
 # =========================
@@ -251,6 +317,7 @@ class Productosacademicos(CertificadoMixin, models.Model):
         on_delete=models.CASCADE,
         related_name="productos_academicos",
         db_column="idperfilconqueestaactivo",
+        db_index=False,  # lo cubre el índice compuesto de Meta.indexes
     )
 
     nombreproducto = models.CharField(max_length=120)
@@ -263,6 +330,13 @@ class Productosacademicos(CertificadoMixin, models.Model):
 
     class Meta:
         db_table = "PRODUCTOSACADEMICOS"
+        # Lecturas públicas: como en Cursosrealizados, por id (no tiene fecha)
+        indexes = [
+            models.Index(
+                fields=["perfil", "idproductoacademico", "activarparaqueseveaenfront"],
+                name="prodacad_perfil_visible_idx",
+            ),
+        ]
 
 
 # =========================
@@ -276,6 +350,7 @@ class Productoslaborales(CertificadoMixin, models.Model):
         on_delete=models.CASCADE,
         related_name="productos_laborales",
         db_column="idperfilconqueestaactivo",
+        db_index=False,  # lo cubre el índice compuesto de Meta.indexes
     )
 
     nombreproducto = models.CharField(max_length=120)
@@ -288,6 +363,13 @@ class Productoslaborales(CertificadoMixin, models.Model):
 
     class Meta:
         db_table = "PRODUCTOSLABORALES"
+        # Lecturas públicas: como en Cursosrealizados
+        indexes = [
+            models.Index(
+                fields=["perfil", "fechaproducto", "idproductolaboral", "activarparaqueseveaenfront"],
+                name="prodlab_perfil_visible_idx",
+            ),
+        ]
 
 
 # =========================
@@ -301,6 +383,7 @@ class Reconocimientos(CertificadoMixin, models.Model):
         on_delete=models.CASCADE,
         related_name="reconocimientos",
         db_column="idperfilconqueestaactivo",
+        db_index=False,  # lo cubre el índice compuesto de Meta.indexes
     )
 
     tiporeconocimiento = models.CharField(max_length=20)
@@ -312,6 +395,13 @@ class Reconocimientos(CertificadoMixin, models.Model):
 
     class Meta:
         db_table = "RECONOCIMIENTOS"
+        # Lecturas públicas: como en Cursosrealizados
+        indexes = [
+            models.Index(
+                fields=["perfil", "fechareconocimiento", "idreconocimiento", "activarparaqueseveaenfront"],
+                name="reconoc_perfil_visible_idx",
+            ),
+        ]
 
 
 # =========================
@@ -325,6 +415,7 @@ class Ventagarage(models.Model):
         on_delete=models.CASCADE,
         related_name="venta_garage",
         db_column="idperfilconqueestaactivo",
+        db_index=False,  # lo cubre el índice compuesto de Meta.indexes
     )
 
     nombreproducto = models.CharField(max_length=120)
@@ -358,3 +449,33 @@ class Ventagarage(models.Model):
 
     class Meta:
         db_table = "VENTAGARAGE"
+        # Lecturas públicas: como en Cursosrealizados
+        indexes = [
+            models.Index(
+                fields=["perfil", "fecha", "idventagarage", "activarparaqueseveaenfront"],
+                name="venta_perfil_visible_idx",
+            ),
+            # Filtros del catálogo (cv/venta.py). Empiezan por la columna
+            # filtrada para no competir con el índice anterior en el listado
+            models.Index(fields=["estadoproducto", "perfil", "fecha"], name="venta_estado_perfil_idx"),
+            models.Index(fields=["valordelbien", "perfil"], name="venta_precio_perfil_idx"),
+        ]
+
+
+# =========================
+# DOCUMENTO DE LECTURA (cv/read_model.py)
+# =========================
+class Documentoperfil(models.Model):
+    # Todo lo visible del perfil en un solo JSON, para las páginas públicas
+    perfil = models.OneToOneField(
+        Datospersonales,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="documento",
+        db_column="idperfil",
+    )
+    datos = models.JSONField()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "DOCUMENTOPERFIL"
@@ -0,0 +1,108 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+from .read_model import SECCIONES
+
+
+# =========================
+# CURSORES ("valor_id" o "id")
+# =========================
+# `order` es una tupla como ("-fechainicio", "-pk"): un campo y luego la
+# clave primaria en la misma dirección, o solo ("-pk",).
+def _spec(order):
+    desc = order[0].startswith("-")
+    field = order[0].lstrip("-")
+    return (None if field == "pk" else field), desc
+
+
+def order_by(model, order):
+    # Los campos que admiten NULL van al final en cualquier dirección
+    field, desc = _spec(order)
+    if field is None or not model._meta.get_field(field).null:
+        return order
+    expr = F(field).desc(nulls_last=True) if desc else F(field).asc(nulls_last=True)
+    return (expr, order[1])
+
+
+def make_cursor(obj, order):
+    field, _desc = _spec(order)
+    if field is None:
+        return str(obj.pk)
+    value = getattr(obj, field)
+    if value is None:
+        value = ""
+    elif isinstance(value, date):
+        value = value.isoformat()
+    return f"{value}_{obj.pk}"
+
+
+def _after(model, cursor, order):
+    # Filas que van después del cursor; ValueError si el cursor no es válido
+    field, desc = _spec(order)
+    op = "lt" if desc else "gt"
+    if field is None:
+        return Q(**{f"pk__{op}": int(cursor)})
+
+    raw, pk = cursor.rsplit("_", 1)
+    pk = int(pk)
+    model_field = model._meta.get_field(field)
+    if raw == "":
+        return Q(**{f"{field}__isnull": True, f"pk__{op}": pk})
+    try:
+        value = model_field.to_python(raw)
+    except ValidationError:
+        raise ValueError(cursor)
+
+    # "fecha <= f AND (fecha < f OR id < i)": la primera parte es una cota
+    # que el índice (perfil, fecha, id) usa para saltar a la posición
+    q = Q(**{f"{field}__{op}e": value}) & (Q(**{f"{field}__{op}": value}) | Q(**{f"pk__{op}": pk}))
+    if model_field.null:
+        q |= Q(**{f"{field}__isnull": True})
+    return q
+
+
+def page_size(params):
+    try:
+        size = int(params.get("n", settings.CV_SECCION_PAGE_SIZE))
+    except ValueError:
+        size = settings.CV_SECCION_PAGE_SIZE
+    return max(1, min(size, settings.CV_SECCION_MAX_PAGE_SIZE))
+
+
+def keyset_page(qs, order, cursor, size):
+    """
+    (ítems, cursor siguiente o None) de `qs` en el orden `order`, después de
+    `cursor`. Lee como mucho size + 1 filas, haya las que haya antes.
+    """
+    if cursor:
+        qs = qs.filter(_after(qs.model, cursor, order))
+    items = list(qs.order_by(*order_by(qs.model, order))[: size + 1])
+    siguiente = make_cursor(items[size - 1], order) if len(items) > size else None
+    return items[:size], siguiente
+
+
+# =========================
+# PÁGINA DE UNA SECCIÓN
+# =========================
+def section_page(perfil, key, params):
+    """
+    Devuelve (ítems, cursor siguiente o None) de la sección `key`.
+    La primera página con el tamaño por defecto sale del documento de
+    lectura; las demás, de una consulta por cursor sobre el índice
+    (perfil, fecha, id), que no depende de cuántas filas haya antes.
+    Lanza ValueError si el cursor no es válido.
+    """
+    related, model, order = SECCIONES[key]
+    size = page_size(params)
+    cursor = params.get("despues")
+
+    if not cursor and size == settings.CV_SECCION_PAGE_SIZE:
+        items = list(getattr(perfil, related).all())
+        siguiente = make_cursor(items[size - 1], order) if len(items) > size else None
+        return items[:size], siguiente
+
+    qs = model.objects.filter(perfil_id=perfil.pk, activarparaqueseveaenfront=True)
+    return keyset_page(qs, order, cursor, size)
@@ -0,0 +1,187 @@
+import io
+import logging
+import tempfile
+import time
+
+from django.conf import settings
+from django.db.models import Sum
+
+# ✅ Para unir PDFs reales al final
+from PyPDF2 import PdfReader, PdfWriter
+
+from .attachments import SKIPPED_INVALID, close_quietly, fetch_all
+from .pdf_optimize import compress_pages, dedupe_objects, linearize
+from .pdf_render import render_cv, render_skipped_page
+from .pdf_reportlab import render_cv as reportlab_render_cv
+from .pdf_reportlab import render_skipped_page as reportlab_render_skipped_page
+from .snapshot import RELACIONES, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDERERS = ("weasyprint", "reportlab")
+
+
+# =========================
+# ADJUNTOS
+# =========================
+def _collect_pdfs(perfil, show, deadline=None):
+    # `perfil` viene de load_snapshot: .all() ya trae solo los visibles
+    items = []
+
+    if show.get("cursos"):
+        for x in perfil.cursos.all():
+            if x.certificado_pdf:
+                items.append((f"Curso: {x.nombrecurso}", x))
+
+    if show.get("exp"):
+        for x in perfil.experiencias.all():
+            if x.certificado_pdf:
+                items.append((f"Experiencia: {x.cargodesempenado} — {x.nombrempresa}", x))
+
+    if show.get("reconoc"):
+        for x in perfil.reconocimientos.all():
+            if x.certificado_pdf:
+                items.append((f"Reconocimiento: {x.tiporeconocimiento}", x))
+
+    if show.get("prod_acad"):
+        for x in perfil.productos_academicos.all():
+            if x.certificado_pdf:
+                items.append((f"Producto académico: {x.nombreproducto}", x))
+
+    if show.get("prod_lab"):
+        for x in perfil.productos_laborales.all():
+            if x.certificado_pdf:
+                items.append((f"Producto laboral: {x.nombreproducto}", x))
+
+    pdfs = []
+    skipped = []
+    # Los que al subirse resultaron ilegibles ni se descargan; del resto se
+    # usa la copia optimizada si existe.
+    validos = []
+    vistos = set()
+    for label, x in items:
+        if x.certificado_paginas == 0:
+            skipped.append((label, SKIPPED_INVALID))
+            continue
+        # El mismo certificado en varios ítems se adjunta una sola vez
+        huella = x.certificado_hash or x.certificado_pdf.name
+        if huella in vistos:
+            continue
+        vistos.add(huella)
+        validos.append((label, x.certificado_pdf_optimizado or x.certificado_pdf))
+
+    results = fetch_all([field for _label, field in validos], deadline)
+    for (label, _field), (f, motivo) in zip(validos, results):
+        if f is None:
+            skipped.append((label, motivo))
+            continue
+        # Se lee aquí y no al unir: uno dañado se lista entre los omitidos y
+        # cuenta para decidir si el PDF va al cache
+        try:
+            pdfs.append(_read_pdf(f))
+        except Exception:
+            close_quietly(f)
+            skipped.append((label, SKIPPED_INVALID))
+
+    return pdfs, skipped
+
+
+def _read_pdf(f):
+    # (archivo, páginas) con el árbol de páginas ya leído por PdfReader
+    return f, list(PdfReader(f).pages)
+
+
+# Sección del show -> relación del perfil con certificados
+SECCIONES_ADJUNTOS = (
+    ("exp", "experiencias"),
+    ("cursos", "cursos"),
+    ("reconoc", "reconocimientos"),
+    ("prod_acad", "productos_academicos"),
+    ("prod_lab", "productos_laborales"),
+)
+
+
+def estimate_attachments(perfil, show):
+    # Páginas y bytes de los adjuntos según los metadatos guardados al subir,
+    # sin descargar nada. Los certificados sin procesar no cuentan.
+    paginas = size = 0
+    for flag, related in SECCIONES_ADJUNTOS:
+        if not show.get(flag):
+            continue
+        totales = (
+            getattr(perfil, related)
+            .filter(activarparaqueseveaenfront=True, certificado_paginas__gt=0)
+            .aggregate(paginas=Sum("certificado_paginas"), bytes=Sum("certificado_bytes"))
+        )
+        paginas += totales["paginas"] or 0
+        size += totales["bytes"] or 0
+    return {"paginas": paginas, "bytes": size}
+
+
+def _merge_pdfs(base_pdf, attachments):
+    # El resultado va a un SpooledTemporaryFile: en memoria hasta
+    # CV_PDF_SPOOL_MAX_BYTES y en disco a partir de ahí. Los adjuntos son
+    # (archivo abierto, páginas) de _read_pdf; el contenido se lee bajo demanda.
+    writer = PdfWriter()
+
+    for p in PdfReader(io.BytesIO(base_pdf)).pages:
+        writer.add_page(p)
+
+    try:
+        for _f, pages in attachments:
+            for p in pages:
+                writer.add_page(p)
+
+        if settings.CV_PDF_OPTIMIZE == "small":
+            dedupe_objects(writer)
+            compress_pages(writer)
+
+        out = tempfile.SpooledTemporaryFile(max_size=settings.CV_PDF_SPOOL_MAX_BYTES)
+        writer.write(out)
+    finally:
+        for f, _pages in attachments:
+            close_quietly(f)
+
+    out.seek(0)
+    return out
+
+
+# =========================
+# PDF FINAL DEL CV + ADJUNTOS
+# =========================
+def build_pdf(perfil, show, motor, base_url, deadline=None):
+    """
+    Genera el PDF completo (CV + adjuntos). Devuelve (archivo, cacheable).
+    """
+    # Presupuesto total: al agotarse se entrega lo que haya llegado
+    if deadline is None:
+        deadline = time.monotonic() + settings.CV_PDF_DEADLINE
+    # Ítems visibles de las secciones elegidas, una consulta por sección
+    perfil = load_snapshot(perfil, [s for s in RELACIONES if show.get(s)])
+
+    if motor == "reportlab":
+        base_pdf = reportlab_render_cv(perfil, show)
+    else:
+        base_pdf = render_cv(perfil, show, base_url)
+
+    attachments, skipped = _collect_pdfs(perfil, show, deadline)
+
+    if skipped:
+        logger.warning(
+            "PDF con %d adjunto(s) omitido(s): %s",
+            len(skipped),
+            ", ".join(sorted({motivo for _label, motivo in skipped})),
+        )
+        if motor == "reportlab":
+            page = reportlab_render_skipped_page(skipped)
+        else:
+            page = render_skipped_page(skipped, base_url)
+        attachments.append(_read_pdf(io.BytesIO(page)))
+
+    final_pdf = _merge_pdfs(base_pdf, attachments)
+    if settings.CV_PDF_LINEARIZE:
+        final_pdf = linearize(final_pdf)
+    # Solo se guarda en cache si lo omitido no cambiará al reintentar: un
+    # timeout o un error pasajero del storage no deben quedar fijos
+    cacheable = all(motivo == SKIPPED_INVALID for _label, motivo in skipped)
+    return final_pdf, cacheable
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from .disk_cache import DiskCache, atomic_write
+from .single_flight import flight
+from .versions import get_version
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_lock = threading.Lock()
+_refreshing = set()
+
+
+# =========================
+# CLAVES
+# =========================
+def normalize_show(show):
+    return ",".join(sorted(k for k, v in show.items() if v))
+
+
+def _variant_key(perfil, show, motor):
+    raw = f"{perfil.pk}|{normalize_show(show)}|{motor}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _pdf_key(variant, version):
+    return hashlib.sha256(f"{variant}|{version}".encode()).hexdigest()
+
+
+def _cache():
+    return DiskCache(
+        Path(settings.CV_CACHE_DIR) / "pdf",
+        settings.CV_PDF_CACHE_MAX_BYTES,
+    )
+
+
+# =========================
+# PUNTEROS A LA ÚLTIMA VERSIÓN DE CADA VARIANTE
+# =========================
+# Permiten servir el PDF anterior mientras se genera el nuevo.
+def _pointer_path(variant):
+    return Path(settings.CV_CACHE_DIR) / "variantes" / variant
+
+
+def _read_pointer(variant):
+    try:
+        return _pointer_path(variant).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _store(cache, variant, key, f):
+    cache.put_chunks(key, iter(lambda: f.read(CHUNK_SIZE), b""))
+    f.seek(0)
+    atomic_write(_pointer_path(variant), key.encode())
+
+
+def _refresh_in_background(cache, variant, key, render):
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            f = _render_once(cache, variant, key, render)
+            f.close()
+        except Exception:
+            logger.exception("No se pudo regenerar el PDF %s", key)
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+            connections.close_all()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+# =========================
+# API
+# =========================
+def get_or_render(perfil, show, render, motor="", deadline=None):
+    """
+    Devuelve un archivo abierto con el PDF para (perfil, versión de datos,
+    show, motor). Si solo existe una versión anterior de la misma variante se
+    sirve esa y se regenera en segundo plano (stale-while-revalidate).
+    `render` devuelve (archivo, cacheable); `deadline` limita la espera a
+    un render idéntico en curso.
+    """
+    cache = _cache()
+    variant = _variant_key(perfil, show, motor)
+    key = _pdf_key(variant, get_version())
+
+    f = cache.open(key)
+    if f is not None:
+        return f
+
+    stale_key = _read_pointer(variant)
+    if stale_key:
+        stale = cache.open(stale_key)
+        if stale is not None:
+            _refresh_in_background(cache, variant, key, render)
+            return stale
+
+    return _render_once(cache, variant, key, render, deadline)
+
+
+def _render_once(cache, variant, key, render, deadline=None):
+    # Peticiones iguales y simultáneas esperan al mismo render
+    with flight(key, deadline) as leader:
+        if not leader:
+            f = cache.open(key)
+            if f is not None:
+                return f
+
+        f, cacheable = render()
+        if cacheable:
+            _store(cache, variant, key, f)
+        return f
+
+
+def current_key(perfil, show, motor=""):
+    # Clave del PDF para los datos actuales (sin servir versiones viejas)
+    return _pdf_key(_variant_key(perfil, show, motor), get_version())
+
+
+def open_cached(key):
+    return _cache().open(key)
+
+
+def is_cached(key):
+    return _cache().path(key).exists()
+
+
+def store(perfil, show, motor, key, f):
+    _store(_cache(), _variant_key(perfil, show, motor), key, f)
@@ -0,0 +1,182 @@
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+from . import pdf_cache, render_pool
+from .disk_cache import atomic_write, atomic_write_chunks
+from .render_pool import RenderCrashed, RenderPoolBusy
+from .single_flight import flight
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+SIGNING_SALT = "cv.pdf_jobs"
+
+PENDIENTE = "pendiente"
+LISTO = "listo"
+ERROR = "error"
+
+_lock = threading.Lock()
+_running = set()
+
+
+# =========================
+# ESTADO DE LOS TRABAJOS (un JSON por trabajo, compartido entre workers)
+# =========================
+# El id es la clave del PDF en el cache: pedir dos veces lo mismo devuelve
+# el mismo trabajo, y un reintento tras un timeout reutiliza el resultado.
+def _jobs_dir():
+    return Path(settings.CV_CACHE_DIR) / "trabajos"
+
+
+def _state_path(job_id):
+    return _jobs_dir() / f"{job_id}.json"
+
+
+def _result_path(job_id):
+    return _jobs_dir() / f"{job_id}.pdf"
+
+
+def _write_state(job_id, estado, **extra):
+    data = {"estado": estado, "actualizado": time.time(), **extra}
+    atomic_write(_state_path(job_id), json.dumps(data).encode())
+
+
+def _read_state(job_id):
+    try:
+        return json.loads(_state_path(job_id).read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+def _prune():
+    # Resultados parciales y estados más viejos que el enlace de descarga
+    limit = time.time() - settings.CV_PDF_JOB_TTL
+    for p in _jobs_dir().glob("*.*"):
+        try:
+            if p.stat().st_mtime < limit:
+                p.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+def _run(job_id, perfil, show, motor, base_url):
+    # El mismo presupuesto total que una petición directa
+    deadline = time.monotonic() + settings.CV_PDF_DEADLINE
+    try:
+        with flight(job_id, deadline) as leader:
+            if not leader and pdf_cache.is_cached(job_id):
+                # Lo generó una petición idéntica que iba en paralelo
+                _write_state(job_id, LISTO, resultado="cache")
+                return
+            _render(job_id, perfil, show, motor, base_url, deadline)
+    except RenderCrashed:
+        _write_state(job_id, ERROR, mensaje="No se pudo generar el PDF. Intenta de nuevo.")
+    except RenderPoolBusy:
+        _write_state(job_id, ERROR, mensaje="Hay demasiadas impresiones en curso.")
+    except Exception:
+        logger.exception("Falló el trabajo de PDF %s", job_id)
+        _write_state(job_id, ERROR, mensaje="No se pudo generar el PDF.")
+    finally:
+        with _lock:
+            _running.discard(job_id)
+        connections.close_all()
+
+
+def _render(job_id, perfil, show, motor, base_url, deadline):
+    f, cacheable = render_pool.render(perfil, show, motor, base_url, deadline)
+    with f:
+        if cacheable:
+            pdf_cache.store(perfil, show, motor, job_id, f)
+            _write_state(job_id, LISTO, resultado="cache")
+        else:
+            # Resultado parcial (faltaron adjuntos): solo para este trabajo
+            atomic_write_chunks(_result_path(job_id), iter(lambda: f.read(64 * 1024), b""))
+            _write_state(job_id, LISTO, resultado="archivo")
+
+
+def submit(perfil, show, motor, base_url):
+    job_id = pdf_cache.current_key(perfil, show, motor)
+
+    if pdf_cache.is_cached(job_id):
+        # Ya generado: no hace falta trabajo
+        return job_id
+
+    state = _read_state(job_id)
+    if state and state["estado"] == PENDIENTE and not _is_stalled(state):
+        return job_id
+
+    with _lock:
+        if job_id in _running:
+            return job_id
+        _running.add(job_id)
+
+    _jobs_dir().mkdir(parents=True, exist_ok=True)
+    _prune()
+    _write_state(job_id, PENDIENTE)
+    threading.Thread(
+        target=_run,
+        args=(job_id, perfil, show, motor, base_url),
+        daemon=True,
+    ).start()
+    return job_id
+
+
+def _is_stalled(state):
+    # Si el worker que lo ejecutaba murió, el estado queda colgado
+    return time.time() - state["actualizado"] > settings.CV_PDF_DEADLINE * 3
+
+
+# =========================
+# CONSULTA Y DESCARGA
+# =========================
+def status(job_id):
+    """
+    Devuelve {"estado": ...}; cuando está listo incluye "token" para la
+    URL de descarga, que caduca a los CV_PDF_JOB_TTL segundos.
+    """
+    result = _open_result(job_id, _read_state(job_id))
+    if result is not None:
+        result.close()
+        return {"estado": LISTO, "token": signing.dumps(job_id, salt=SIGNING_SALT)}
+
+    state = _read_state(job_id)
+    if state is None:
+        return None
+    if state["estado"] == PENDIENTE and _is_stalled(state):
+        return {"estado": ERROR, "mensaje": "El trabajo se interrumpió."}
+    if state["estado"] == LISTO:
+        # El resultado se expulsó del cache: hay que volver a pedirlo
+        return {"estado": ERROR, "mensaje": "El resultado ya no está disponible."}
+    return {k: v for k, v in state.items() if k in ("estado", "mensaje")}
+
+
+def _open_result(job_id, state):
+    f = pdf_cache.open_cached(job_id)
+    if f is not None:
+        return f
+    if state and state.get("resultado") == "archivo":
+        try:
+            return open(_result_path(job_id), "rb")
+        except FileNotFoundError:
+            return None
+    return None
+
+
+def open_download(token):
+    """
+    Valida el token firmado y abre el PDF. Lanza signing.BadSignature (o
+    SignatureExpired) si el enlace no es válido o caducó.
+    """
+    job_id = signing.loads(token, salt=SIGNING_SALT, max_age=settings.CV_PDF_JOB_TTL)
+    return _open_result(job_id, _read_state(job_id))
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import logging
+import tempfile
+
+from django.conf import settings
+
+from PyPDF2.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    StreamObject,
+)
+
+# pikepdf (qpdf) está en requirements.txt; solo se usa para linealizar
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+logger = logging.getLogger(__name__)
+
+# Diccionarios que se pueden compartir entre páginas sin cambiar el resultado
+COMPARTIBLES = {"/Font", "/FontDescriptor", "/ExtGState", "/Encoding"}
+
+
+def _serialize(obj):
+    out = io.BytesIO()
+    obj.write_to_stream(out, None)
+    return hashlib.sha256(out.getvalue()).digest()
+
+
+def _shareable(obj):
+    if isinstance(obj, StreamObject):
+        # Imágenes, fuentes incrustadas, perfiles ICC... (el contenido de
+        # página se descarta antes, en dedupe_objects)
+        return obj.get("/Type") != "/Metadata"
+    if isinstance(obj, DictionaryObject):
+        return obj.get("/Type") in COMPARTIBLES
+    return False
+
+
+def _page_contents(writer):
+    # idnum de los streams de contenido de las páginas: /Contents es una
+    # referencia a un stream o un array (directo o no) de referencias
+    ids = set()
+    for page in writer.pages:
+        pending = [page.raw_get("/Contents")] if "/Contents" in page else []
+        while pending:
+            obj = pending.pop()
+            if isinstance(obj, IndirectObject):
+                ids.add(obj.idnum)
+                obj = obj.get_object()
+            if isinstance(obj, ArrayObject):
+                pending.extend(obj)
+    return ids
+
+
+def _remap(obj, remap):
+    # Cambia referencias a duplicados por la del objeto que se conserva
+    if isinstance(obj, DictionaryObject):
+        items = obj.items()
+    elif isinstance(obj, ArrayObject):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, IndirectObject):
+            if value.idnum in remap:
+                obj[key] = IndirectObject(remap[value.idnum], 0, value.pdf)
+        else:
+            _remap(value, remap)
+
+
+# =========================
+# DEDUPLICACIÓN DE OBJETOS
+# =========================
+def dedupe_objects(writer):
+    """
+    Une los objetos idénticos del PDF (fuentes, logos, imágenes repetidos
+    entre certificados de la misma institución). Se repite hasta que no
+    cambia nada: unir streams puede volver idénticas a las fuentes que los usan.
+    """
+    objects = writer._objects
+    # El contenido de página casi nunca se repite y es lo más grande de hashear
+    contenidos = _page_contents(writer)
+    while True:
+        seen = {}
+        remap = {}
+        for i, obj in enumerate(objects):
+            if obj is None or i + 1 in contenidos or not _shareable(obj):
+                continue
+            digest = _serialize(obj)
+            if digest in seen:
+                remap[i + 1] = seen[digest]
+            else:
+                seen[digest] = i + 1
+
+        if not remap:
+            return
+
+        for obj in objects:
+            if obj is not None:
+                _remap(obj, remap)
+        # El xref de PyPDF2 exige numeración continua: el hueco queda como null
+        for idnum in remap:
+            objects[idnum - 1] = NullObject()
+
+
+def compress_pages(writer):
+    # Solo los contenidos que llegan sin filtro (los ya comprimidos se dejan)
+    for page in writer.pages:
+        contents = page.get("/Contents")
+        if contents is None:
+            continue
+        contents = contents.get_object()
+        if isinstance(contents, StreamObject) and "/Filter" in contents:
+            continue
+        ref = page.raw_get("/Contents")
+        page.compress_content_streams()
+        # PyPDF2 deja el stream comprimido como objeto directo dentro de la
+        # página, que no es PDF válido (qpdf y otros visores la descartan):
+        # ocupa el lugar del original o, si era un array, uno nuevo
+        if isinstance(ref, IndirectObject) and isinstance(contents, StreamObject):
+            writer._objects[ref.idnum - 1] = page["/Contents"]
+            page[NameObject("/Contents")] = ref
+        else:
+            page[NameObject("/Contents")] = writer._add_object(page["/Contents"])
+
+
+# =========================
+# PDF LINEALIZADO ("VISTA RÁPIDA EN WEB")
+# =========================
+def linearize(f):
+    """
+    Reescribe el PDF linealizado para que el visor muestre la primera página
+    sin esperar al resto. Sin pikepdf devuelve el mismo archivo.
+    """
+    if pikepdf is None:
+        logger.warning("pikepdf no está instalado: el PDF no se linealiza")
+        return f
+
+    out = tempfile.SpooledTemporaryFile(max_size=settings.CV_PDF_SPOOL_MAX_BYTES)
+    try:
+        with pikepdf.open(f) as pdf:
+            pdf.save(out, linearize=True)
+    except Exception:
+        logger.exception("No se pudo linealizar el PDF")
+        out.close()
+        f.seek(0)
+        return f
+
+    f.close()
+    out.seek(0)
+    return out
@@ -0,0 +1,203 @@
+import mimetypes
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+from .attachments import close_quietly, open_file
+
+STYLESHEET = Path(__file__).resolve().parent / "static" / "css" / "cv_pdf.css"
+
+# Secciones del PDF en orden (flags de show), cada una en pdf/partes/<sección>.html
+SECCIONES = ("exp", "cursos", "reconoc", "prod_acad", "prod_lab")
+
+
+# =========================
+# RECURSOS COMPARTIDOS DE WEASYPRINT
+# =========================
+# La hoja de estilos se parsea una sola vez por proceso y todas las
+# maquetaciones comparten la misma FontConfiguration. Pango no es seguro
+# entre hilos, así que las maquetaciones del proceso van de una en una.
+_lock = threading.Lock()
+_render_lock = threading.Lock()
+_resources = None
+
+
+def _font_face_css(fonts_dir):
+    # Cada .ttf/.otf de CV_PDF_FONTS_DIR (DejaVu Sans por defecto) se registra
+    # como "Helvetica": la familia de cv_pdf.css se resuelve siempre con
+    # archivos locales, no con lo que fontconfig encuentre en el servidor.
+    rules = []
+    for path in sorted(Path(fonts_dir).glob("*.[ot]tf")):
+        name = path.stem.lower()
+        weight = "bold" if "bold" in name else "normal"
+        style = "italic" if ("italic" in name or "oblique" in name) else "normal"
+        rules.append(
+            "@font-face { font-family: Helvetica; "
+            f"src: url({path.as_uri()}); font-weight: {weight}; font-style: {style}; }}"
+        )
+    return "\n".join(rules)
+
+
+def _get_resources():
+    global _resources
+    with _lock:
+        if _resources is None:
+            font_config = FontConfiguration()
+            stylesheets = []
+            font_css = _font_face_css(settings.CV_PDF_FONTS_DIR)
+            if font_css:
+                stylesheets.append(CSS(string=font_css, font_config=font_config))
+            stylesheets.append(CSS(filename=str(STYLESHEET), font_config=font_config))
+            _resources = (stylesheets, font_config)
+        return _resources
+
+
+# =========================
+# RECURSOS DEL DOCUMENTO SIN HTTP
+# =========================
+_assets_lock = threading.Lock()
+_assets = OrderedDict()
+_assets_bytes = 0
+
+
+def _asset_get(url):
+    with _assets_lock:
+        data = _assets.get(url)
+        if data is not None:
+            _assets.move_to_end(url)
+        return data
+
+
+def _asset_put(url, data):
+    global _assets_bytes
+    with _assets_lock:
+        if url in _assets:
+            return
+        _assets[url] = data
+        _assets_bytes += len(data)
+        while _assets_bytes > settings.CV_PDF_ASSET_CACHE_MAX_BYTES and len(_assets) > 1:
+            _old_url, old = _assets.popitem(last=False)
+            _assets_bytes -= len(old)
+
+
+def _read_storage(storage, name):
+    with storage.open(name, "rb") as f:
+        return f.read()
+
+
+class LocalURLFetcher(URLFetcher):
+    """
+    url_fetcher de WeasyPrint que nunca sale a la red: STATIC_URL y
+    MEDIA_URL del propio sitio se leen de sus storages, las URLs de los
+    archivos conocidos (`files`) de su FieldFile, y todo lo demás se
+    rechaza. Lo leído queda en un cache en memoria del proceso.
+    """
+
+    def __init__(self, base_url=None, files=()):
+        super().__init__(allowed_protocols=("http", "https", "file", "data"))
+        self.host = urlsplit(base_url).netloc if base_url else None
+        self.files = {f.url: f for f in files if f}
+
+    def fetch(self, url, headers=None):
+        if url.startswith("data:"):
+            return super().fetch(url, headers)
+
+        data = _asset_get(url)
+        if data is None:
+            data = self._load(url)
+            if data is None:
+                raise ValueError(f"URL no permitida en el PDF: {url}")
+            _asset_put(url, data)
+
+        mime_type = mimetypes.guess_type(urlsplit(url).path)[0] or "application/octet-stream"
+        return URLFetcherResponse(url, data, {"Content-Type": mime_type})
+
+    def _load(self, url):
+        if url in self.files:
+            f = open_file(self.files[url])
+            if f is None:
+                return None
+            try:
+                return f.read()
+            finally:
+                close_quietly(f)
+
+        parts = urlsplit(url)
+        path = unquote(parts.path)
+
+        if parts.scheme == "file":
+            # Solo las fuentes de CV_PDF_FONTS_DIR
+            if Path(path).resolve().parent == Path(settings.CV_PDF_FONTS_DIR).resolve():
+                return Path(path).read_bytes()
+            return None
+
+        if self.host is None or parts.netloc != self.host:
+            return None
+
+        try:
+            if path.startswith(settings.STATIC_URL):
+                name = path[len(settings.STATIC_URL):]
+                try:
+                    return _read_storage(staticfiles_storage, name)
+                except (OSError, ValueError):
+                    # Sin collectstatic (desarrollo): directo desde la app
+                    found = finders.find(name)
+                    return Path(found).read_bytes() if found else None
+            if path.startswith(settings.MEDIA_URL):
+                return _read_storage(default_storage, path[len(settings.MEDIA_URL):])
+        except Exception:
+            return None
+        return None
+
+
+def _write_pdf(html, base_url, files=()):
+    stylesheets, font_config = _get_resources()
+    with _render_lock:
+        return HTML(
+            string=html,
+            base_url=base_url,
+            url_fetcher=LocalURLFetcher(base_url, files),
+        ).write_pdf(
+            stylesheets=stylesheets,
+            font_config=font_config,
+        )
+
+
+def warm_up():
+    # Se llama al arrancar cada worker (gunicorn.conf.py): parsea los
+    # estilos, carga las fuentes y maqueta una página mínima.
+    html = render_to_string("pdf/omitidos.html", {"omitidos": [("—", "—")]})
+    _write_pdf(html, None)
+
+
+# =========================
+# CV COMPLETO
+# =========================
+def cv_html(perfil, show):
+    """
+    HTML completo del CV (pdf/cv.html): la barra lateral y las secciones
+    elegidas en la columna principal.
+    """
+    partes = [f"pdf/partes/{parte}.html" for parte in SECCIONES if show.get(parte)]
+    return render_to_string("pdf/cv.html", {"perfil": perfil, "partes": partes})
+
+
+def render_cv(perfil, show, base_url):
+    # Una sola maquetación para todo el documento
+    return _write_pdf(cv_html(perfil, show), base_url, files=[perfil.foto_perfil])
+
+
+def render_skipped_page(skipped, base_url):
+    html = render_to_string("pdf/omitidos.html", {"omitidos": skipped})
+    return _write_pdf(html, base_url)
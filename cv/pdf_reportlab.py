@@ -0,0 +1,268 @@
+import io
+from xml.sax.saxutils import escape
+
+from django.utils.formats import localize
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import (
+    BaseDocTemplate,
+    Frame,
+    HRFlowable,
+    Image,
+    NextPageTemplate,
+    PageTemplate,
+    Paragraph,
+    Spacer,
+)
+
+from .attachments import close_quietly, open_file
+
+# =========================
+# MEDIDAS Y ESTILOS (mismos valores que static/css/cv_pdf.css; 1px = 0.75pt)
+# =========================
+MARGIN = 1.5 * cm
+SIDEBAR_RATIO = 0.32
+SIDEBAR_BG = colors.HexColor("#1f2a33")
+ACCENT = colors.HexColor("#2563eb")
+TEXT = colors.HexColor("#111827")
+
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+# Las fuentes estándar de PDF no tienen "→"
+ARROW = "–"
+
+ST_NAME = ParagraphStyle("name", fontName=FONT_BOLD, fontSize=13.5, leading=17, alignment=1, textColor=colors.white)
+ST_SUBTITLE = ParagraphStyle("subtitle", fontName=FONT, fontSize=8.25, leading=12, alignment=1, textColor=colors.HexColor("#dfe1e3"), spaceAfter=13.5)
+ST_SIDE_TITLE = ParagraphStyle("side_title", fontName=FONT, fontSize=7.5, leading=11, textColor=colors.HexColor("#a5aaad"), spaceAfter=4.5)
+ST_SIDE_VALUE = ParagraphStyle("side_value", fontName=FONT, fontSize=8.25, leading=12, textColor=colors.white, spaceAfter=3)
+
+ST_SECTION = ParagraphStyle("section_title", fontName=FONT_BOLD, fontSize=9.75, leading=13, textColor=colors.HexColor("#1f2937"))
+ST_ITEM_TITLE = ParagraphStyle("item_title", fontName=FONT_BOLD, fontSize=8.6, leading=12.5, textColor=TEXT)
+ST_ITEM_SUB = ParagraphStyle("item_sub", fontName=FONT, fontSize=7.9, leading=11.8, textColor=colors.HexColor("#4b5563"))
+ST_ITEM_DESC = ParagraphStyle("item_desc", fontName=FONT, fontSize=7.9, leading=11.8, textColor=TEXT, spaceBefore=1.5)
+ST_CERT = ParagraphStyle("cert", fontName=FONT, fontSize=7.5, leading=11, textColor=colors.HexColor("#374151"), spaceBefore=2.25)
+
+
+def _p(text, style):
+    return Paragraph(escape(str(text)), style)
+
+
+def _fmt(value):
+    # Igual que {{ valor }} en la plantilla (fechas localizadas)
+    return str(localize(value))
+
+
+# =========================
+# BARRA LATERAL
+# =========================
+def _photo(perfil):
+    f = open_file(perfil.foto_perfil)
+    if f is None:
+        return None
+    try:
+        data = io.BytesIO(f.read())
+    finally:
+        close_quietly(f)
+    img = Image(data, width=82.5, height=82.5)
+    img.hAlign = "CENTER"
+    return img
+
+
+def _sidebar(perfil):
+    flow = []
+
+    if perfil.foto_perfil:
+        img = _photo(perfil)
+        if img is not None:
+            flow += [img, Spacer(0, 13.5)]
+
+    flow.append(_p(f"{perfil.nombres} {perfil.apellidos}", ST_NAME))
+
+    if perfil.descripcionperfil:
+        flow.append(_p(perfil.descripcionperfil, ST_SUBTITLE))
+    else:
+        flow.append(Spacer(0, 13.5))
+
+    flow.append(_p("DATOS PERSONALES", ST_SIDE_TITLE))
+    for label, value in (
+        ("Cédula", perfil.numerocedula),
+        ("Nacimiento", perfil.fechanacimiento),
+        ("Nacionalidad", perfil.nacionalidad),
+        ("Sexo", perfil.sexo),
+        ("Estado civil", perfil.estadocivil),
+    ):
+        if value:
+            flow.append(Paragraph(f"<b>{escape(label)}:</b> {escape(_fmt(value))}", ST_SIDE_VALUE))
+
+    return flow
+
+
+# =========================
+# SECCIONES
+# =========================
+def _item(title, sub=None, desc=None, cert=None):
+    flow = [_p(title, ST_ITEM_TITLE)]
+    if sub:
+        flow.append(_p(sub, ST_ITEM_SUB))
+    if desc:
+        flow.append(_p(desc, ST_ITEM_DESC))
+    if cert:
+        flow.append(_p(cert, ST_CERT))
+    flow.append(Spacer(0, 9))
+    return flow
+
+
+def _has_cert(x):
+    return bool(x.certificado_pdf or x.certificado_imagen)
+
+
+def _section_exp(perfil):
+    for x in perfil.experiencias.all():
+        fin = _fmt(x.fechafin) if x.fechafin else "Actualidad"
+        yield from _item(
+            f"{x.cargodesempenado} — {x.nombrempresa}",
+            f"{_fmt(x.fechainicio)} {ARROW} {fin}",
+            x.responsabilidades,
+            "Certificado adjunto" if _has_cert(x) else None,
+        )
+
+
+def _section_cursos(perfil):
+    for x in perfil.cursos.all():
+        sub = f"{_fmt(x.fechainicio)} {ARROW} {_fmt(x.fechafin)}"
+        if x.entidadpatrocinadora:
+            sub += f" | {x.entidadpatrocinadora}"
+        yield from _item(
+            x.nombrecurso,
+            sub,
+            x.descripcioncurso,
+            "Certificado adjunto" if _has_cert(x) else None,
+        )
+
+
+def _section_reconoc(perfil):
+    for x in perfil.reconocimientos.all():
+        yield from _item(
+            x.tiporeconocimiento,
+            x.entidadpatrocinadora,
+            x.descripcionreconocimiento,
+            "Documento adjunto" if _has_cert(x) else None,
+        )
+
+
+def _section_prod_acad(perfil):
+    for x in perfil.productos_academicos.all():
+        yield from _item(
+            x.nombreproducto,
+            None,
+            x.descripcion,
+            "Documento adjunto" if _has_cert(x) else None,
+        )
+
+
+def _section_prod_lab(perfil):
+    for x in perfil.productos_laborales.all():
+        yield from _item(
+            x.nombreproducto,
+            _fmt(x.fechaproducto),
+            x.descripcion,
+            "Documento adjunto" if _has_cert(x) else None,
+        )
+
+
+# Mismo orden que pdf/cv.html
+SECCIONES = (
+    ("exp", "Experiencia Laboral", _section_exp),
+    ("cursos", "Cursos y Formación", _section_cursos),
+    ("reconoc", "Reconocimientos", _section_reconoc),
+    ("prod_acad", "Productos Académicos", _section_prod_acad),
+    ("prod_lab", "Productos Laborales", _section_prod_lab),
+)
+
+
+def _section_title(title):
+    return [
+        _p(title.upper(), ST_SECTION),
+        HRFlowable(width="100%", thickness=1.5, color=ACCENT, spaceBefore=3, spaceAfter=7.5),
+    ]
+
+
+# =========================
+# DOCUMENTO
+# =========================
+def _document(buf, sidebar=None):
+    doc = BaseDocTemplate(
+        buf,
+        pagesize=A4,
+        leftMargin=MARGIN,
+        rightMargin=MARGIN,
+        topMargin=MARGIN,
+        bottomMargin=MARGIN,
+        title="Hoja de Vida",
+    )
+
+    if sidebar is None:
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="content")
+        doc.addPageTemplates([PageTemplate(id="resto", frames=[frame])])
+        return doc
+
+    sidebar_w = doc.width * SIDEBAR_RATIO
+    content = Frame(
+        doc.leftMargin + sidebar_w, doc.bottomMargin, doc.width - sidebar_w, doc.height,
+        leftPadding=22.5, rightPadding=22.5, topPadding=18.75, bottomPadding=18.75,
+        id="content",
+    )
+
+    def draw_sidebar(canvas, doc):
+        canvas.saveState()
+        canvas.setFillColor(SIDEBAR_BG)
+        canvas.rect(doc.leftMargin, doc.bottomMargin, sidebar_w, doc.height, stroke=0, fill=1)
+        frame = Frame(
+            doc.leftMargin, doc.bottomMargin, sidebar_w, doc.height,
+            leftPadding=15, rightPadding=15, topPadding=18.75, bottomPadding=18.75,
+        )
+        frame.addFromList(list(sidebar), canvas)
+        canvas.restoreState()
+
+    doc.addPageTemplates([
+        PageTemplate(id="primera", frames=[content], onPage=draw_sidebar),
+        PageTemplate(id="resto", frames=[content]),
+    ])
+    return doc
+
+
+def render_cv(perfil, show):
+    """
+    Dibuja la hoja de vida con ReportLab: la misma barra lateral y las
+    mismas secciones que pdf/cv.html, sin pasar por HTML/CSS.
+    """
+    buf = io.BytesIO()
+    doc = _document(buf, sidebar=_sidebar(perfil))
+
+    story = [NextPageTemplate("resto"), Spacer(0, 0)]
+    for key, title, build in SECCIONES:
+        if show.get(key):
+            story += _section_title(title)
+            story += list(build(perfil))
+            story.append(Spacer(0, 7.5))
+
+    doc.build(story)
+    return buf.getvalue()
+
+
+def render_skipped_page(skipped):
+    buf = io.BytesIO()
+    doc = _document(buf)
+
+    story = _section_title("Adjuntos no incluidos")
+    story.append(_p("Los siguientes certificados no pudieron incluirse en este documento.", ST_ITEM_DESC))
+    story.append(Spacer(0, 9))
+    for label, motivo in skipped:
+        story += _item(label, motivo)
+
+    doc.build(story)
+    return buf.getvalue()
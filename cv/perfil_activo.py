@@ -0,0 +1,42 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Datospersonales
+from .versions import SELLO_CONTEOS, get_version
+
+_lock = threading.Lock()
+# (perfil o None, sello de versión, vence en time.monotonic())
+_cached = None
+
+
+# =========================
+# PERFIL ACTIVO (CACHE POR PROCESO)
+# =========================
+def get_perfil_activo():
+    """
+    Perfil activo, leído de la base de datos como mucho una vez cada
+    CV_PERFIL_CACHE_TTL segundos por proceso. Cualquier save/delete de
+    Datospersonales o cambio de sus conteos cambia un sello de versión y la
+    copia se descarta en todos los workers en la siguiente petición.
+    """
+    global _cached
+    version = get_version("datospersonales", SELLO_CONTEOS)
+    now = time.monotonic()
+
+    with _lock:
+        cached = _cached
+    if cached is not None and cached[1] == version and now < cached[2]:
+        return cached[0]
+
+    perfil = Datospersonales.objects.filter(perfilactivo=True).order_by("-idperfil").first()
+    with _lock:
+        _cached = (perfil, version, now + settings.CV_PERFIL_CACHE_TTL)
+    return perfil
+
+
+def clear():
+    global _cached
+    with _lock:
+        _cached = None
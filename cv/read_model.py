@@ -0,0 +1,126 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+
+from .models import (
+    Datospersonales,
+    Documentoperfil,
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+    Ventagarage,
+)
+
+# Sección -> (relación del perfil, modelo, orden estable: fecha y luego id)
+SECCIONES = {
+    "exp": ("experiencias", Experiencialaboral, ("-fechainicio", "-pk")),
+    "cursos": ("cursos", Cursosrealizados, ("-fechainicio", "-pk")),
+    "reconoc": ("reconocimientos", Reconocimientos, ("-fechareconocimiento", "-pk")),
+    "prod_acad": ("productos_academicos", Productosacademicos, ("-pk",)),
+    "prod_lab": ("productos_laborales", Productoslaborales, ("-fechaproducto", "-pk")),
+    "venta": ("venta_garage", Ventagarage, ("-fecha", "-pk")),
+}
+
+
+# =========================
+# FILAS <-> JSON
+# =========================
+def _fields(model):
+    return model._meta.concrete_fields
+
+
+def _dump(obj):
+    data = {}
+    for f in _fields(type(obj)):
+        value = f.value_from_object(obj)
+        if isinstance(f, models.FileField):
+            value = value.name or None
+        elif isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        data[f.attname] = value
+    return data
+
+
+def _load(model, data):
+    # Instancia como si viniera de la base de datos: las plantillas y los
+    # FieldFile (.url) funcionan igual
+    fields = _fields(model)
+    values = [None if data[f.attname] is None else f.to_python(data[f.attname]) for f in fields]
+    return model.from_db("default", [f.attname for f in fields], values)
+
+
+def _is_current(doc):
+    # Si cambió algún modelo o el tamaño de página, el documento se rehace
+    if doc.get("por_pagina") != settings.CV_SECCION_PAGE_SIZE:
+        return False
+    if set(doc["perfil"]) != {f.attname for f in _fields(Datospersonales)}:
+        return False
+    for key, (_related, model, _order) in SECCIONES.items():
+        items = doc["secciones"].get(key)
+        if items is None:
+            return False
+        if items and set(items[0]) != {f.attname for f in _fields(model)}:
+            return False
+    return True
+
+
+# =========================
+# CONSTRUCCIÓN
+# =========================
+def rebuild(perfil_id):
+    """
+    Rehace el documento del perfil (o lo borra si el perfil ya no existe).
+    Se llama desde signals.py dentro de la transacción del cambio, así el
+    documento se confirma junto con los datos.
+    """
+    perfil = Datospersonales.objects.filter(pk=perfil_id).first()
+    if perfil is None:
+        Documentoperfil.objects.filter(pk=perfil_id).delete()
+        return None
+
+    # Solo la primera página de cada sección (y uno más para saber si hay
+    # siguiente): el documento no crece con la tabla
+    size = settings.CV_SECCION_PAGE_SIZE
+    doc = {"perfil": _dump(perfil), "por_pagina": size, "secciones": {}}
+    for key, (related, _model, order) in SECCIONES.items():
+        items = getattr(perfil, related).filter(activarparaqueseveaenfront=True).order_by(*order)
+        doc["secciones"][key] = [_dump(x) for x in items[: size + 1]]
+
+    Documentoperfil.objects.update_or_create(perfil_id=perfil_id, defaults={"datos": doc})
+    return doc
+
+
+# =========================
+# LECTURA
+# =========================
+def load_documento(perfil):
+    """
+    Perfil reconstruido desde su documento con una sola consulta por clave
+    primaria. Cada relación (perfil.cursos.all, ...) devuelve la primera
+    página de ítems visibles, ya ordenados, sin ir a la base de datos (ver
+    paginacion.section_page).
+    """
+    doc = Documentoperfil.objects.filter(pk=perfil.pk).values_list("datos", flat=True).first()
+    if doc is None or not _is_current(doc):
+        doc = rebuild(perfil.pk)
+        if doc is None:
+            return None
+
+    snapshot = _load(Datospersonales, doc["perfil"])
+    snapshot._prefetched_objects_cache = {}
+    for key, (related, model, _order) in SECCIONES.items():
+        items = [_load(model, data) for data in doc["secciones"][key]]
+        for x in items:
+            model.perfil.field.set_cached_value(x, snapshot)
+        # Igual que prefetch_related: un QuerySet con el resultado ya cargado
+        qs = model.objects.all()
+        qs._result_cache = items
+        qs._prefetch_done = True
+        snapshot._prefetched_objects_cache[related] = qs
+    return snapshot
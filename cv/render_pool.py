@@ -0,0 +1,264 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+from django.conf import settings
+
+from .disk_cache import release_flock, try_flock
+
+logger = logging.getLogger(__name__)
+
+
+class RenderPoolBusy(Exception):
+    """No hay cupo en la cola de impresión del host."""
+
+
+class RenderCrashed(RenderPoolBusy):
+    """El proceso de render murió a mitad de un PDF; el siguiente usa uno nuevo."""
+
+
+# =========================
+# CUPOS COMPARTIDOS ENTRE WORKERS (flock)
+# =========================
+# CV_PDF_RENDER_SLOTS impresiones a la vez en todo el host y como mucho
+# CV_PDF_RENDER_QUEUE esperando. El worker de gunicorn (sync) queda
+# bloqueado mientras tanto, así que entre las dos nunca pasan de
+# WEB_CONCURRENCY - 1: siempre queda un worker para las páginas HTML. El
+# resto se rechaza enseguida.
+def _lock_dir():
+    path = Path(settings.CV_CACHE_DIR) / "render"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _acquire_any(prefix, count):
+    directory = _lock_dir()
+    for i in range(count):
+        fd = try_flock(directory / f"{prefix}-{i}")
+        if fd is not None:
+            return fd
+    return None
+
+
+def _tickets():
+    slots = settings.CV_PDF_RENDER_SLOTS
+    return min(slots + settings.CV_PDF_RENDER_QUEUE, settings.WEB_CONCURRENCY - 1)
+
+
+@contextmanager
+def _admission(deadline):
+    slots = settings.CV_PDF_RENDER_SLOTS
+    ticket = _acquire_any("ticket", _tickets())
+    if ticket is None:
+        raise RenderPoolBusy()
+    try:
+        # Con ticket, se espera turno para uno de los cupos de render, como
+        # mucho hasta el plazo de la petición
+        slot = _acquire_any("slot", slots)
+        while slot is None:
+            if time.monotonic() > deadline:
+                raise RenderPoolBusy()
+            time.sleep(0.1)
+            slot = _acquire_any("slot", slots)
+        try:
+            yield
+        finally:
+            release_flock(slot)
+    finally:
+        release_flock(ticket)
+
+
+# =========================
+# PROCESOS DE RENDER
+# =========================
+# Los hijos que maquetan, con su propia memoria. En el proceso de render del
+# host (ver más abajo) son CV_PDF_RENDER_SLOTS; sin él, uno por proceso.
+_lock = threading.Lock()
+_executor = None
+_pool_size = 1
+
+
+def _child_init():
+    import django
+
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn: el hijo no hereda hilos ni conexiones del worker
+            _executor = ProcessPoolExecutor(
+                max_workers=_pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_child_init,
+                max_tasks_per_child=settings.CV_PDF_RENDER_MAX_TASKS,
+            )
+        return _executor
+
+
+def _reset_executor(broken):
+    # Un hijo muerto (sin memoria, fallo dentro de Pango) deja el pool roto
+    # para siempre: se descarta y la próxima impresión arranca otro
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _local_submit(fn, *args):
+    executor = _get_executor()
+    try:
+        return executor.submit(fn, *args).result()
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise RenderCrashed()
+
+
+# =========================
+# PROCESO DE RENDER DEL HOST
+# =========================
+# El master de gunicorn arranca un solo proceso de render (gunicorn.conf.py)
+# y los workers le mandan cada impresión por un socket Unix: la memoria de
+# WeasyPrint no se multiplica por WEB_CONCURRENCY. Sin ese proceso
+# (runserver, manage.py, pruebas o si murió) se usa un hijo propio.
+def _socket_path():
+    return _lock_dir() / "render.sock"
+
+
+def _authkey():
+    return hashlib.sha256(f"cv.render_pool:{settings.SECRET_KEY}".encode()).digest()
+
+
+def _submit(fn, *args):
+    try:
+        conn = Client(str(_socket_path()), family="AF_UNIX", authkey=_authkey())
+    except (FileNotFoundError, ConnectionRefusedError):
+        return _local_submit(fn, *args)
+    with conn:
+        conn.send((fn, args))
+        try:
+            ok, value = conn.recv()
+        except EOFError:
+            # El proceso de render murió con la impresión a medias
+            raise RenderCrashed()
+    if not ok:
+        raise value
+    return value
+
+
+def _handle(conn):
+    with conn:
+        try:
+            fn, args = conn.recv()
+            result = (True, _local_submit(fn, *args))
+        except Exception as exc:
+            result = (False, exc)
+        try:
+            conn.send(result)
+        except Exception:
+            # El worker ya no espera, o la excepción no se pudo serializar
+            pass
+
+
+def _serve():
+    global _pool_size
+    import django
+
+    django.setup()
+    _pool_size = settings.CV_PDF_RENDER_SLOTS
+    signal.signal(signal.SIGTERM, lambda *_args: sys.exit(0))
+
+    path = _socket_path()
+    path.unlink(missing_ok=True)
+    listener = Listener(str(path), family="AF_UNIX", authkey=_authkey())
+    try:
+        # Primera maquetación de WeasyPrint fuera de una petición real
+        try:
+            _local_submit(_warm_up_in_child)
+        except Exception:
+            logger.exception("No se pudo precalentar WeasyPrint")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError):
+                continue
+            threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+    finally:
+        listener.close()
+        # Sin esperar a que los hijos terminen lo que estuvieran maquetando
+        for child in multiprocessing.active_children():
+            child.terminate()
+
+
+def start_server():
+    """
+    Arranca el proceso de render del host; lo llama el master de gunicorn
+    antes de crear los workers. Devuelve el multiprocessing.Process.
+    """
+    process = multiprocessing.get_context("spawn").Process(target=_serve, name="cv-render")
+    process.start()
+    return process
+
+
+def _render_in_child(perfil_id, show, motor, base_url, budget):
+    from django.db import close_old_connections
+
+    from .models import Datospersonales
+    from .pdf_build import build_pdf
+
+    # El hijo no recibe las señales de petición: las conexiones persistentes
+    # (conn_max_age) que el servidor ya cerró se descartan aquí
+    close_old_connections()
+    try:
+        # El plazo llega como segundos restantes y se vuelve a fijar aquí
+        deadline = time.monotonic() + budget
+        perfil = Datospersonales.objects.get(pk=perfil_id)
+        f, cacheable = build_pdf(perfil, show, motor, base_url, deadline)
+    finally:
+        close_old_connections()
+    tmp_dir = Path(settings.CV_CACHE_DIR) / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=tmp_dir, suffix=".pdf")
+    with f, os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(f, out)
+    return path, cacheable
+
+
+def _warm_up_in_child():
+    from .pdf_render import warm_up
+
+    warm_up()
+
+
+def render(perfil, show, motor, base_url, deadline):
+    """
+    Genera el PDF en el proceso de render del host, con uno de sus cupos.
+    `deadline` (time.monotonic) es el plazo total de la petición: cubre la
+    espera del cupo y la descarga de adjuntos. Lanza RenderPoolBusy si la
+    cola está llena o no hubo cupo a tiempo, y RenderCrashed si el hijo
+    murió. Devuelve (archivo, cacheable).
+    """
+    with _admission(deadline):
+        budget = max(0.0, deadline - time.monotonic())
+        path, cacheable = _submit(_render_in_child, perfil.pk, show, motor, base_url, budget)
+
+    # Abierto y borrado: el espacio se libera al cerrar la respuesta
+    f = open(path, "rb")
+    os.unlink(path)
+    return f, cacheable
@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import perfil_activo
+from .conteos import CONTEOS, actualizar_conteo
+from .read_model import rebuild
+from .certificados import procesar_certificado
+from .models import (
+    CertificadoMixin,
+    Datospersonales,
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+    Ventagarage,
+)
+from .versions import bump_version
+
+MODELOS = (
+    Datospersonales,
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+    Ventagarage,
+)
+
+
+# =========================
+# INVALIDACIÓN DE VERSIONES
+# =========================
+@receiver(post_save)
+@receiver(post_delete)
+def cambiar_version(sender, **kwargs):
+    # Tras el commit: otro worker no debe releer los datos viejos con el sello nuevo
+    if sender in MODELOS:
+        name = sender._meta.model_name
+        transaction.on_commit(lambda: bump_version(name))
+
+    if sender is Datospersonales:
+        # Este proceso lo olvida ya; los demás, al ver el sello nuevo
+        perfil_activo.clear()
+
+
+# =========================
+# METADATOS DE CERTIFICADOS
+# =========================
+@receiver(pre_save)
+def procesar_certificado_subido(sender, instance, raw=False, **kwargs):
+    # Solo cuando cambia el archivo: uno nuevo sin guardar aún, o se quitó
+    if raw or not isinstance(instance, CertificadoMixin):
+        return
+    archivo = instance.certificado_pdf
+    if archivo and archivo._committed:
+        return
+    if not archivo and instance.certificado_hash is None:
+        return
+    procesar_certificado(instance)
+
+
+# =========================
+# CONTEOS DE ÍTEMS VISIBLES
+# =========================
+@receiver(pre_save)
+def recordar_perfil_anterior(sender, instance, raw=False, **kwargs):
+    # Si el ítem cambia de perfil hay que recontar también el anterior
+    if raw or sender not in CONTEOS or instance.pk is None:
+        return
+    instance._perfil_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list("perfil_id", flat=True).first()
+    )
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def actualizar_conteos(sender, instance, raw=False, **kwargs):
+    if raw or sender not in CONTEOS:
+        return
+    anterior = getattr(instance, "_perfil_anterior", None)
+    if anterior == instance.perfil_id:
+        anterior = None
+    actualizar_conteo(sender, instance.perfil_id, anterior)
+
+
+# =========================
+# DOCUMENTO DE LECTURA
+# =========================
+# Registrado al final: corre después de actualizar los conteos del perfil.
+@receiver(post_save)
+@receiver(post_delete)
+def reconstruir_documento(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or sender not in MODELOS:
+        return
+    if sender is Datospersonales:
+        # Solo en post_save: al borrar el perfil el documento cae en cascada
+        if "created" in kwargs:
+            rebuild(instance.pk)
+        return
+    if isinstance(origin, Datospersonales) or getattr(origin, "model", None) is Datospersonales:
+        # Ítems borrados en cascada junto con su perfil
+        return
+
+    anterior = getattr(instance, "_perfil_anterior", None)
+    for perfil_id in {instance.perfil_id, anterior} - {None}:
+        rebuild(perfil_id)
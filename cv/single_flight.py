@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from .disk_cache import release_flock, try_flock
+
+_lock = threading.Lock()
+_in_flight = {}
+
+
+def _lock_path(key):
+    # Un archivo por clave: dos renders distintos nunca comparten candado
+    path = Path(settings.CV_CACHE_DIR) / "vuelos"
+    path.mkdir(parents=True, exist_ok=True)
+    return path / hashlib.sha256(key.encode()).hexdigest()
+
+
+def _try_lock(path):
+    # try_flock, comprobando que el archivo bloqueado sigue siendo el de la
+    # ruta: quien suelta el candado lo borra, y un descriptor abierto antes
+    # del borrado apuntaría a un archivo que ya nadie más ve
+    while True:
+        fd = try_flock(path)
+        if fd is None:
+            return None
+        try:
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        release_flock(fd)
+
+
+def _unlock(path, fd):
+    # Se borra con el candado tomado, así no quedan archivos por clave
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    release_flock(fd)
+
+
+def _wait_flock(path, timeout):
+    give_up = time.monotonic() + timeout
+    while True:
+        fd = _try_lock(path)
+        if fd is not None or time.monotonic() >= give_up:
+            return fd
+        time.sleep(0.05)
+
+
+# =========================
+# UN SOLO RENDER POR CLAVE
+# =========================
+@contextmanager
+def flight(key, deadline=None):
+    """
+    Coordina a quienes quieren generar lo mismo a la vez, dentro del
+    proceso (Event) y entre procesos del host (flock).
+
+    Entrega True al primero, que debe generar. Los demás esperan hasta
+    CV_PDF_SINGLEFLIGHT_TIMEOUT, o hasta `deadline` (time.monotonic) si
+    llega antes, y reciben False: deben mirar el cache primero y, si no
+    está, generar ellos mismos.
+    """
+    timeout = settings.CV_PDF_SINGLEFLIGHT_TIMEOUT
+    if deadline is not None:
+        timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+
+    with _lock:
+        event = _in_flight.get(key)
+        leader = event is None
+        if leader:
+            event = _in_flight[key] = threading.Event()
+
+    if not leader:
+        event.wait(timeout)
+        yield False
+        return
+
+    path = _lock_path(key)
+    fd = None
+    try:
+        fd = _try_lock(path)
+        if fd is not None:
+            yield True
+        else:
+            # Otro proceso está generando lo mismo: se espera a que termine
+            fd = _wait_flock(path, timeout)
+            yield False
+    finally:
+        if fd is not None:
+            _unlock(path, fd)
+        with _lock:
+            _in_flight.pop(key, None)
+        event.set()
@@ -0,0 +1,45 @@
+import copy
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import (
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+)
+from .read_model import SECCIONES
+
+# Sección (flag de show) -> (relación del perfil, modelo)
+RELACIONES = {
+    "exp": ("experiencias", Experiencialaboral),
+    "cursos": ("cursos", Cursosrealizados),
+    "reconoc": ("reconocimientos", Reconocimientos),
+    "prod_acad": ("productos_academicos", Productosacademicos),
+    "prod_lab": ("productos_laborales", Productoslaborales),
+}
+
+
+# =========================
+# PERFIL CON SUS SECCIONES VISIBLES
+# =========================
+def load_snapshot(perfil, secciones=tuple(RELACIONES)):
+    """
+    Copia de `perfil` con los ítems visibles de cada sección ya cargados:
+    una consulta por sección, sin importar cuántos ítems haya. En las
+    plantillas `perfil.cursos.all` devuelve solo los visibles, ordenados.
+    """
+    # Copia: el perfil puede ser el compartido del cache por proceso
+    snapshot = copy.copy(perfil)
+    snapshot._prefetched_objects_cache = {}
+
+    # En el orden de las páginas públicas (read_model.SECCIONES): así salen
+    # los ítems y sus adjuntos en el PDF
+    prefetches = []
+    for s in secciones:
+        related, model = RELACIONES[s]
+        qs = model.objects.filter(activarparaqueseveaenfront=True).order_by(*SECCIONES[s][2])
+        prefetches.append(Prefetch(related, queryset=qs))
+    prefetch_related_objects([snapshot], *prefetches)
+    return snapshot
@@ -1,3 +1,1076 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+import pikepdf
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import NullObject
+from reportlab.pdfgen import canvas
+
+from . import attachments, pdf_cache, pdf_jobs, perfil_activo, render_pool, single_flight
+from .models import (
+    Datospersonales,
+    Documentoperfil,
+    Cursosrealizados,
+    Experiencialaboral,
+    Productosacademicos,
+    Productoslaborales,
+    Reconocimientos,
+    Ventagarage,
+)
+from .disk_cache import release_flock, try_flock
+from .http_ranges import ranged_file_response
+from .paginacion import _after
+from .pdf_build import build_pdf
+from .pdf_optimize import compress_pages, dedupe_objects
+from .pdf_render import cv_html
+from .pdf_reportlab import render_cv
+from .read_model import rebuild
+from .render_pool import RenderPoolBusy
+from .versions import SELLO_CONTEOS, bump_version, get_version
+
+SHOW_TODO = {"exp": True, "cursos": True, "reconoc": True, "prod_acad": True, "prod_lab": True}
+
+# Archivos en disco también cuando CLOUDINARY_URL está definida
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def _words(text):
+    # Palabras en minúsculas, ignorando signos sueltos (→, —, |)
+    return {w for w in re.findall(r"\w[\w.:@/-]*", text.casefold())}
+
+
+def _pdf_bytes(texto):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    c.drawString(72, 720, texto)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _recorrer(client, url):
+    # Sigue siguiente_url desde `url`; devuelve los ítems de cada página
+    paginas = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        paginas.append(list(response.context["items"]))
+        siguiente = response.context["siguiente_url"]
+        url = url.split("?", 1)[0] + siguiente if siguiente else None
+    return paginas
+
+
+class LocalFilesMixin:
+    """
+    Cada prueba con su propio CV_CACHE_DIR y MEDIA_ROOT temporales. Los
+    datos se crean dentro de captureOnCommitCallbacks(execute=True) para
+    que los sellos de versión cambien como tras un commit real.
+    """
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(
+            CV_CACHE_DIR=Path(tmp.name) / "cache",
+            MEDIA_ROOT=Path(tmp.name) / "media",
+            STORAGES=TEST_STORAGES,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        perfil_activo.clear()
+
+    def crear_perfil(self, **extra):
+        datos = {
+            "nombres": "Derian",
+            "apellidos": "Avila",
+            "fechanacimiento": date(1999, 5, 20),
+            "numerocedula": "1312345678",
+            "perfilactivo": True,
+            **extra,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            return Datospersonales.objects.create(**datos)
+
+
+class RenderFalso:
+    # render() para pdf_cache: cuenta las llamadas y devuelve "v<n>"
+    def __init__(self, cacheable=True, demora=0):
+        self.llamadas = 0
+        self.cacheable = cacheable
+        self.demora = demora
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.llamadas += 1
+            n = self.llamadas
+        time.sleep(self.demora)
+        return io.BytesIO(f"v{n}".encode()), self.cacheable
+
+
+class PdfCacheTests(LocalFilesMixin, TestCase):
+    SHOW = {"cursos": True, "exp": False}
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = self.crear_perfil()
+
+    def _leer(self, render):
+        with pdf_cache.get_or_render(self.perfil, self.SHOW, render) as f:
+            return f.read()
+
+    def _esperar_regeneracion(self):
+        give_up = time.monotonic() + 5
+        while pdf_cache._refreshing and time.monotonic() < give_up:
+            time.sleep(0.01)
+
+    def test_hit_does_not_render(self):
+        render = RenderFalso()
+        self.assertEqual(self._leer(render), b"v1")
+        self.assertEqual(self._leer(render), b"v1")
+        self.assertEqual(render.llamadas, 1)
+
+    def test_serves_stale_while_revalidating(self):
+        render = RenderFalso()
+        self._leer(render)
+        bump_version("cursosrealizados")
+
+        # La versión anterior enseguida; la nueva se genera en segundo plano
+        self.assertEqual(self._leer(render), b"v1")
+        self._esperar_regeneracion()
+        self.assertEqual(render.llamadas, 2)
+        self.assertEqual(self._leer(render), b"v2")
+        self.assertEqual(render.llamadas, 2)
+
+    def test_other_selection_is_not_stale(self):
+        render = RenderFalso()
+        self._leer(render)
+        with pdf_cache.get_or_render(self.perfil, {"exp": True}, render) as f:
+            self.assertEqual(f.read(), b"v2")
+
+    def test_partial_pdf_is_not_cached(self):
+        render = RenderFalso(cacheable=False)
+        self.assertEqual(self._leer(render), b"v1")
+        self.assertEqual(self._leer(render), b"v2")
+
+
+class SingleFlightTests(LocalFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.perfil = self.crear_perfil()
+
+    def test_concurrent_misses_render_once(self):
+        render = RenderFalso(demora=0.2)
+        resultados = []
+
+        def pedir():
+            with pdf_cache.get_or_render(self.perfil, {"cursos": True}, render) as f:
+                resultados.append(f.read())
+
+        hilos = [threading.Thread(target=pedir) for _ in range(5)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join(5)
+
+        self.assertEqual(render.llamadas, 1)
+        self.assertEqual(resultados, [b"v1"] * 5)
+
+    def test_waits_for_another_process(self):
+        # Otro proceso del host tiene el candado de la clave
+        path = single_flight._lock_path("clave")
+        fd = try_flock(path)
+        try:
+            inicio = time.monotonic()
+            with single_flight.flight("clave", deadline=inicio + 0.3) as leader:
+                self.assertFalse(leader)
+            self.assertGreaterEqual(time.monotonic() - inicio, 0.3)
+        finally:
+            release_flock(fd)
+
+        with single_flight.flight("clave") as leader:
+            self.assertTrue(leader)
+        # Quien suelta el candado borra su archivo
+        self.assertFalse(path.exists())
+
+    def test_different_keys_do_not_wait(self):
+        with single_flight.flight("una") as primero:
+            inicio = time.monotonic()
+            with single_flight.flight("otra") as segundo:
+                self.assertTrue(primero and segundo)
+            self.assertLess(time.monotonic() - inicio, 0.1)
+
+
+class TrabajosPdfTests(LocalFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_perfil(permitir_impresion=True)
+        self.pdf = _pdf_bytes("Hoja de vida")
+        self.llamadas = 0
+        patcher = mock.patch("cv.render_pool.render", side_effect=self._render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _render(self, perfil, show, motor, base_url, deadline):
+        self.llamadas += 1
+        return io.BytesIO(self.pdf), True
+
+    def _crear(self, **datos):
+        response = self.client.post(reverse("crear_trabajo_pdf"), {"cursos": "1", **datos})
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def _esperar(self, estado_url):
+        give_up = time.monotonic() + 5
+        while True:
+            data = self.client.get(estado_url).json()
+            if data["estado"] != pdf_jobs.PENDIENTE or time.monotonic() > give_up:
+                return data
+            time.sleep(0.02)
+
+    def test_submit_poll_download(self):
+        trabajo = self._crear()
+        data = self._esperar(trabajo["estado_url"])
+        self.assertEqual(data["estado"], pdf_jobs.LISTO)
+
+        response = self.client.get(data["descarga_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.pdf)
+        response.close()
+
+        # Lo mismo otra vez: mismo trabajo, ya en cache, sin render
+        self.assertEqual(self._crear()["id"], trabajo["id"])
+        self.assertEqual(self._esperar(trabajo["estado_url"])["estado"], pdf_jobs.LISTO)
+        self.assertEqual(self.llamadas, 1)
+
+    def test_busy_pool_is_reported(self):
+        with mock.patch("cv.render_pool.render", side_effect=RenderPoolBusy()):
+            trabajo = self._crear()
+            data = self._esperar(trabajo["estado_url"])
+        self.assertEqual(data["estado"], pdf_jobs.ERROR)
+        self.assertIn("mensaje", data)
+
+    def test_download_link_expires(self):
+        trabajo = self._crear()
+        self._esperar(trabajo["estado_url"])
+        # Un token firmado hace más de CV_PDF_JOB_TTL segundos
+        antes = time.time() - settings.CV_PDF_JOB_TTL - 5
+        with mock.patch("django.core.signing.time.time", return_value=antes):
+            token = signing.dumps(trabajo["id"], salt=pdf_jobs.SIGNING_SALT)
+        response = self.client.get(reverse("descargar_trabajo_pdf", args=[token]))
+        self.assertEqual(response.status_code, 410)
+
+    def test_unknown_job_is_404(self):
+        self.assertEqual(self.client.get(reverse("estado_trabajo_pdf", args=["0" * 64])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("estado_trabajo_pdf", args=["zz"])).status_code, 404)
+
+
+class RespuestaFalsa:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+@override_settings(CV_ATTACHMENT_CACHE_FRESH=0)
+class AdjuntosCacheTests(LocalFilesMixin, TestCase):
+    URL = "https://res.cloudinary.com/demo/raw/upload/certificado.pdf"
+
+    def _descargar(self, *respuestas):
+        session = mock.Mock()
+        session.get.side_effect = list(respuestas)
+        with mock.patch("cv.attachments.get_session", return_value=session):
+            with attachments._download(self.URL, 5) as f:
+                return f.read(), session.get.call_args.kwargs["headers"]
+
+    def test_revalidates_with_etag(self):
+        data, headers = self._descargar(RespuestaFalsa(200, b"uno", {"ETag": '"a"'}))
+        self.assertEqual((data, headers), (b"uno", {}))
+
+        # 304: el cuerpo sale del cache
+        data, headers = self._descargar(RespuestaFalsa(304))
+        self.assertEqual(data, b"uno")
+        self.assertEqual(headers, {"If-None-Match": '"a"'})
+
+        # Cambió en el origen: se guarda el nuevo y su ETag
+        data, _headers = self._descargar(RespuestaFalsa(200, b"dos", {"ETag": '"b"'}))
+        self.assertEqual(data, b"dos")
+        _data, headers = self._descargar(RespuestaFalsa(304))
+        self.assertEqual(headers, {"If-None-Match": '"b"'})
+
+    @override_settings(CV_ATTACHMENT_CACHE_FRESH=3600)
+    def test_fresh_copy_skips_the_request(self):
+        self._descargar(RespuestaFalsa(200, b"uno", {"ETag": '"a"'}))
+        session = mock.Mock()
+        with mock.patch("cv.attachments.get_session", return_value=session):
+            with attachments._download(self.URL, 5) as f:
+                self.assertEqual(f.read(), b"uno")
+        session.get.assert_not_called()
+
+
+class ReportlabParityTests(TestCase):
+    def setUp(self):
+        self.perfil = Datospersonales.objects.create(
+            nombres="Derian",
+            apellidos="Avila",
+            descripcionperfil="Desarrollador de software",
+            fechanacimiento=date(1999, 5, 20),
+            numerocedula="1312345678",
+            nacionalidad="Ecuatoriana",
+            sexo="H",
+            perfilactivo=True,
+            permitir_impresion=True,
+        )
+        Experiencialaboral.objects.create(
+            perfil=self.perfil,
+            nombrempresa="Empresa Uno",
+            cargodesempenado="Programador",
+            fechainicio=date(2021, 1, 4),
+            fechafin=date(2022, 3, 31),
+            responsabilidades="Mantenimiento de sistemas internos",
+        )
+        Cursosrealizados.objects.create(
+            perfil=self.perfil,
+            nombrecurso="Django avanzado",
+            fechainicio=date(2020, 6, 1),
+            fechafin=date(2020, 7, 15),
+            entidadpatrocinadora="Universidad Laica",
+            descripcioncurso="Vistas, ORM y despliegue",
+        )
+        Reconocimientos.objects.create(
+            perfil=self.perfil,
+            tiporeconocimiento="Académico",
+            fechareconocimiento=date(2019, 11, 2),
+            entidadpatrocinadora="Facultad de Ciencias",
+            descripcionreconocimiento="Mejor promedio",
+        )
+        Productosacademicos.objects.create(
+            perfil=self.perfil,
+            nombreproducto="Tesis de grado",
+            clasificador="TESIS",
+            descripcion="Sistema de gestión académica",
+        )
+        Productoslaborales.objects.create(
+            perfil=self.perfil,
+            nombreproducto="Portal de clientes",
+            fechaproducto=date(2022, 2, 1),
+            descripcion="Aplicación web interna",
+        )
+
+    def _template_words(self, show):
+        # Mismo HTML que maqueta WeasyPrint
+        html = cv_html(self.perfil, show)
+        body = html.split("<body>", 1)[1]
+        return _words(strip_tags(body))
+
+    def _reportlab_words(self, show):
+        reader = PdfReader(io.BytesIO(render_cv(self.perfil, show)))
+        return _words(" ".join(p.extract_text() for p in reader.pages))
+
+    def test_same_text_as_template(self):
+        missing = self._template_words(SHOW_TODO) - self._reportlab_words(SHOW_TODO)
+        self.assertEqual(missing, set())
+
+    def test_respects_show_flags(self):
+        show = dict(SHOW_TODO, cursos=False, prod_lab=False)
+        words = self._reportlab_words(show)
+        self.assertEqual(self._template_words(show) - words, set())
+        self.assertNotIn("django", words)
+        self.assertNotIn("portal", words)
+
+
+class PublicIndexTests(TestCase):
+    # (modelo, índice, orden de la lectura pública)
+    LECTURAS = (
+        (Cursosrealizados, "cursos_perfil_visible_idx", ("-fechainicio", "-pk")),
+        (Experiencialaboral, "exp_perfil_visible_idx", ("-fechainicio", "-pk")),
+        (Reconocimientos, "reconoc_perfil_visible_idx", ("-fechareconocimiento", "-pk")),
+        (Productosacademicos, "prodacad_perfil_visible_idx", ("-pk",)),
+        (Productoslaborales, "prodlab_perfil_visible_idx", ("-fechaproducto", "-pk")),
+        (Ventagarage, "venta_perfil_visible_idx", ("-fecha", "-pk")),
+    )
+
+    def setUp(self):
+        self.perfil = Datospersonales.objects.create(
+            nombres="Derian",
+            apellidos="Avila",
+            fechanacimiento=date(1999, 5, 20),
+            numerocedula="1312345678",
+            perfilactivo=True,
+        )
+
+    def _plan(self, qs):
+        if connection.vendor == "postgresql":
+            # Con tablas de prueba casi vacías el planificador prefiere recorrerlas
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+        return qs.explain()
+
+    def test_visible_items_use_composite_index(self):
+        # El índice da el orden (fecha, id): sin ordenar en memoria
+        for model, index, order in self.LECTURAS:
+            qs = model.objects.filter(perfil=self.perfil, activarparaqueseveaenfront=True).order_by(*order)
+            plan = self._plan(qs[:21])
+            self.assertIn(index, plan, model.__name__)
+            self.assertNotRegex(plan, r"TEMP B-TREE|\bSort\b", model.__name__)
+
+    def test_visible_count_is_index_only(self):
+        # La subconsulta de los conteos (cv/conteos.py) no toca la tabla
+        for model, index, _order in self.LECTURAS:
+            qs = model.objects.filter(perfil=self.perfil, activarparaqueseveaenfront=True).values("perfil")
+            plan = self._plan(qs)
+            self.assertIn(index, plan, model.__name__)
+            self.assertRegex(plan, r"COVERING INDEX|Index Only Scan", model.__name__)
+
+    def test_active_profile_uses_partial_index(self):
+        qs = Datospersonales.objects.filter(perfilactivo=True).order_by("-idperfil")
+        self.assertIn("perfil_activo_idx", self._plan(qs))
+
+    def test_cursor_is_seekable(self):
+        # "fecha <= f AND (...)" da una cota sobre el índice: salta al cursor
+        for model, index, order in self.LECTURAS:
+            field = order[0].lstrip("-")
+            if field == "pk":
+                continue
+            qs = model.objects.filter(perfil=self.perfil, activarparaqueseveaenfront=True)
+            qs = qs.filter(_after(model, "2020-01-01_5", order)).order_by(*order)
+            plan = self._plan(qs[:21])
+            self.assertIn(index, plan, model.__name__)
+            self.assertRegex(plan, rf"\b{field}\s*<", model.__name__)
+            self.assertNotRegex(plan, r"TEMP B-TREE|\bSort\b", model.__name__)
+
+
+class AdjuntosPdfTests(LocalFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.perfil = self.crear_perfil()
+        with self.captureOnCommitCallbacks(execute=True):
+            for nombre, fecha in (("Bueno", date(2021, 1, 1)), ("Dañado", date(2020, 1, 1))):
+                Cursosrealizados.objects.create(
+                    perfil=self.perfil,
+                    nombrecurso=nombre,
+                    fechainicio=fecha,
+                    fechafin=fecha,
+                    certificado_pdf=SimpleUploadedFile(f"{nombre}.pdf", _pdf_bytes(f"Certificado {nombre}")),
+                )
+
+    def test_corrupt_attachment_is_listed_as_invalid(self):
+        # Válido al subirlo y dañado después en el storage
+        curso = Cursosrealizados.objects.get(nombrecurso="Dañado")
+        Path(curso.certificado_pdf.path).write_bytes(b"%PDF-1.4\nbasura")
+
+        with self.assertLogs("cv.pdf_build", "WARNING"):
+            f, cacheable = build_pdf(self.perfil, {"cursos": True}, "reportlab", None)
+        with f:
+            paginas = [p.extract_text() for p in PdfReader(f).pages]
+
+        self.assertTrue(cacheable)
+        self.assertIn("Certificado Bueno", paginas[-2])
+        self.assertIn("Curso: Dañado", paginas[-1])
+        self.assertIn("El PDF está dañado", paginas[-1])
+        self.assertNotIn("Certificado Dañado", "".join(paginas))
+
+
+    def test_attachments_follow_public_order(self):
+        # Creado el último pero el más reciente: va primero, como en /cursos/
+        with self.captureOnCommitCallbacks(execute=True):
+            Cursosrealizados.objects.create(
+                perfil=self.perfil,
+                nombrecurso="Reciente",
+                fechainicio=date(2022, 1, 1),
+                fechafin=date(2022, 1, 1),
+                certificado_pdf=SimpleUploadedFile("reciente.pdf", _pdf_bytes("Certificado Reciente")),
+            )
+
+        f, _cacheable = build_pdf(self.perfil, {"cursos": True}, "reportlab", None)
+        with f:
+            adjuntos = [p.extract_text().strip() for p in PdfReader(f).pages[-3:]]
+        self.assertEqual(adjuntos, ["Certificado Reciente", "Certificado Bueno", "Certificado Dañado"])
+
+
+    @override_settings(CV_CERTIFICADO_OPTIMIZAR=True)
+    def test_optimized_copy_is_linearized(self):
+        buf = io.BytesIO()
+        c = canvas.Canvas(buf, pageCompression=0)
+        for i in range(40):
+            c.drawString(72, 760 - i * 18, "Certificado de asistencia al curso")
+        c.showPage()
+        c.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            curso = Cursosrealizados.objects.create(
+                perfil=self.perfil,
+                nombrecurso="Optimizado",
+                fechainicio=date(2022, 1, 1),
+                fechafin=date(2022, 1, 1),
+                certificado_pdf=SimpleUploadedFile("optimizado.pdf", buf.getvalue()),
+            )
+
+        self.assertTrue(curso.certificado_pdf_optimizado)
+        self.assertLess(curso.certificado_pdf_optimizado.size, curso.certificado_bytes)
+        with pikepdf.open(curso.certificado_pdf_optimizado.path) as pdf:
+            self.assertTrue(pdf.is_linearized)
+            self.assertEqual(len(pdf.pages), 1)
+
+
+@override_settings(CV_PERFIL_CACHE_TTL=3600)
+class PerfilActivoTests(LocalFilesMixin, TestCase):
+    def test_switching_active_profile_invalidates_cached_document(self):
+        a = self.crear_perfil(nombres="Ana")
+        self.assertEqual(self.client.get(reverse("home")).context["perfil"].pk, a.pk)
+
+        # Como en otro worker: sin clear() local y con el TTL sin vencer, solo
+        # el sello de versión descarta la copia
+        with mock.patch.object(perfil_activo, "clear"):
+            b = self.crear_perfil(nombres="Beatriz", numerocedula="1398765432")
+        a.refresh_from_db()
+        self.assertFalse(a.perfilactivo)
+
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["perfil"].pk, b.pk)
+        self.assertContains(response, "Beatriz")
+        self.assertNotContains(response, "Ana")
+
+    def test_cached_profile_skips_the_lookup(self):
+        a = self.crear_perfil()
+        self.assertEqual(perfil_activo.get_perfil_activo().pk, a.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(perfil_activo.get_perfil_activo().pk, a.pk)
+
+
+class DescargaCertificadosTests(LocalFilesMixin, TestCase):
+    def test_zip_streams_certificates_and_lists_missing(self):
+        perfil = self.crear_perfil()
+        datos = {"Python": _pdf_bytes("Certificado Python"), "Django": _pdf_bytes("Certificado Django")}
+        cursos = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            for nombre, data in datos.items():
+                cursos[nombre] = Cursosrealizados.objects.create(
+                    perfil=perfil,
+                    nombrecurso=nombre,
+                    fechainicio=date(2021, 1, 1),
+                    fechafin=date(2021, 1, 1),
+                    certificado_pdf=SimpleUploadedFile(f"{nombre}.pdf", data),
+                )
+        # Borrado del storage después de subirlo
+        Path(cursos["Django"].certificado_pdf.path).unlink()
+
+        response = self.client.get(reverse("descargar_certificados"))
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertTrue(response.streaming)
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as zf:
+            python = f"cursos/python-{cursos['Python'].pk}.pdf"
+            django = f"cursos/django-{cursos['Django'].pk}.pdf"
+            self.assertEqual(zf.namelist(), [python, "omitidos.txt"])
+            self.assertEqual(zf.read(python), datos["Python"])
+            self.assertEqual(zf.read("omitidos.txt").decode(), f"No se pudieron leer:\n{django}\n")
+
+
+class RenderAdmissionTests(LocalFilesMixin, TestCase):
+    def _admitir(self):
+        return render_pool._admission(time.monotonic() + 1)
+
+    @override_settings(WEB_CONCURRENCY=3, CV_PDF_RENDER_SLOTS=2, CV_PDF_RENDER_QUEUE=2)
+    def test_leaves_one_web_worker_free(self):
+        # 2 cupos + 2 en cola, pero solo 3 workers: como mucho 2 impresiones
+        with self._admitir():
+            with self.assertRaises(RenderPoolBusy):
+                with self._admitir(), self._admitir():
+                    pass
+        with self._admitir():
+            pass
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_single_worker_never_blocks_on_pdf(self):
+        with self.assertRaises(RenderPoolBusy):
+            with self._admitir():
+                pass
+
+
+class DedupeObjectsTests(TestCase):
+    def setUp(self):
+        # Dos certificados iguales: misma fuente y mismo contenido de página
+        self.writer = PdfWriter()
+        for _ in range(2):
+            for page in PdfReader(io.BytesIO(_pdf_bytes("Igual"))).pages:
+                self.writer.add_page(page)
+
+    def _ref(self, page, *path):
+        obj = page
+        for key in path[:-1]:
+            obj = obj[key]
+        return obj.raw_get(path[-1]).idnum
+
+    def test_shares_fonts_but_not_page_contents(self):
+        contenidos = [self._ref(p, "/Contents") for p in self.writer.pages]
+        self.assertEqual(len(set(self._ref(p, "/Resources", "/Font", "/F1") for p in self.writer.pages)), 2)
+
+        dedupe_objects(self.writer)
+
+        self.assertEqual([self._ref(p, "/Contents") for p in self.writer.pages], contenidos)
+        for idnum in contenidos:
+            self.assertNotIsInstance(self.writer._objects[idnum - 1], NullObject)
+        self.assertEqual(len(set(self._ref(p, "/Resources", "/Font", "/F1") for p in self.writer.pages)), 1)
+
+        out = io.BytesIO()
+        self.writer.write(out)
+        self.assertEqual([p.extract_text().strip() for p in PdfReader(out).pages], ["Igual", "Igual"])
+
+
+class CompressPagesTests(TestCase):
+    def test_compressed_contents_stay_a_valid_pdf(self):
+        buf = io.BytesIO()
+        c = canvas.Canvas(buf, pageCompression=0)
+        for i in range(40):
+            c.drawString(72, 760 - i * 18, "Contenido sin comprimir")
+        c.showPage()
+        c.save()
+        writer = PdfWriter()
+        for page in PdfReader(io.BytesIO(buf.getvalue())).pages:
+            writer.add_page(page)
+
+        compress_pages(writer)
+        out = io.BytesIO()
+        writer.write(out)
+
+        self.assertLess(len(out.getvalue()), len(buf.getvalue()) // 2)
+        out.seek(0)
+        with pikepdf.open(out) as pdf:
+            self.assertEqual(pdf.check_pdf_syntax(), [])
+            self.assertEqual(len(pdf.pages), 1)
+            self.assertTrue(pdf.pages[0].obj.Contents.is_indirect)
+            self.assertEqual(pdf.pages[0].obj.Contents.Filter, "/FlateDecode")
+
+
+class RangedFileResponseTests(TestCase):
+    ETAG = "abc123"
+
+    def setUp(self):
+        self.data = _pdf_bytes("Hoja de vida")
+        self.factory = RequestFactory()
+
+    def _get(self, etag=ETAG, **headers):
+        request = self.factory.get("/imprimir/", headers=headers)
+        response = ranged_file_response(
+            request,
+            io.BytesIO(self.data),
+            content_type="application/pdf",
+            filename="hoja_de_vida.pdf",
+            etag=etag,
+        )
+        self.addCleanup(response.close)
+        return response
+
+    def _body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file_advertises_ranges(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.data)
+        self.assertEqual(response["ETag"], f'"{self.ETAG}"')
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_range_returns_partial_content(self):
+        response = self._get(range="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._body(response), self.data[:10])
+        self.assertEqual(response["Content-Range"], f"bytes 0-9/{len(self.data)}")
+        self.assertEqual(response["Content-Length"], "10")
+
+    def test_open_and_suffix_ranges(self):
+        response = self._get(range=f"bytes={len(self.data) - 4}-")
+        self.assertEqual(self._body(response), self.data[-4:])
+        response = self._get(range="bytes=-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._body(response), self.data[-5:])
+
+    def test_unsatisfiable_range_returns_416(self):
+        response = self._get(range=f"bytes={len(self.data)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_invalid_range_is_ignored(self):
+        response = self._get(range="bytes=9-2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.data)
+
+    def test_if_range_must_match_etag(self):
+        response = self._get(range="bytes=0-9", if_range='"otro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), self.data)
+
+        response = self._get(range="bytes=0-9", if_range=f'"{self.ETAG}"')
+        self.assertEqual(response.status_code, 206)
+
+    def test_if_none_match_returns_304(self):
+        response = self._get(if_none_match=f'"{self.ETAG}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], f'"{self.ETAG}"')
+
+    def test_no_ranges_without_etag(self):
+        response = self._get(etag=None, range="bytes=0-9")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Accept-Ranges", response)
+
+
+@override_settings(CV_CERTIFICADO_PROXY=True)
+class CertificadoProxyTests(LocalFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = _pdf_bytes("Certificado de prueba")
+        perfil = self.crear_perfil()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curso = Cursosrealizados.objects.create(
+                perfil=perfil,
+                nombrecurso="Django avanzado",
+                fechainicio=date(2020, 6, 1),
+                fechafin=date(2020, 7, 15),
+                certificado_pdf=SimpleUploadedFile("certificado.pdf", self.data),
+            )
+        self.url = reverse("ver_certificado_pdf", args=["curso", self.curso.pk])
+        self.etag = f'"{self.curso.certificado_hash}"'
+
+    def _get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_serves_file_with_hash_etag(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_serves_ranges(self):
+        response = self._get(range="bytes=0-9", if_range=self.etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[:10])
+
+    def test_not_modified_before_opening_the_file(self):
+        with mock.patch("cv.views.open_file") as open_file:
+            response = self._get(if_none_match=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("no-cache", response["Cache-Control"])
+        open_file.assert_not_called()
+
+    def test_unreadable_file_falls_back_to_redirect(self):
+        os.remove(self.curso.certificado_pdf.path)
+        response = self._get()
+        self.assertRedirects(response, self.curso.certificado_pdf.url, fetch_redirect_response=False)
+
+    @override_settings(CV_CERTIFICADO_PROXY=False)
+    def test_redirects_without_proxy(self):
+        response = self._get()
+        self.assertRedirects(response, self.curso.certificado_pdf.url, fetch_redirect_response=False)
+
+    def test_unknown_record_is_404(self):
+        response = self.client.get(reverse("ver_certificado_pdf", args=["curso", self.curso.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConteosDocumentoTests(LocalFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.perfil = self.crear_perfil()
+
+    def crear_curso(self, **extra):
+        datos = {
+            "perfil": self.perfil,
+            "nombrecurso": "Django avanzado",
+            "fechainicio": date(2020, 6, 1),
+            "fechafin": date(2020, 7, 15),
+            **extra,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            return Cursosrealizados.objects.create(**datos)
+
+    def test_item_change_keeps_profile_stamp(self):
+        # La barra lateral del PDF depende del sello de datospersonales
+        perfil = get_version("datospersonales")
+        conteos = get_version(SELLO_CONTEOS)
+        self.crear_curso()
+        self.assertEqual(get_version("datospersonales"), perfil)
+        self.assertNotEqual(get_version(SELLO_CONTEOS), conteos)
+
+    def guardar(self, obj):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.save()
+
+    def visibles(self, perfil):
+        # (conteo_cursos, cursos del documento de lectura) del perfil
+        perfil.refresh_from_db()
+        doc = Documentoperfil.objects.get(pk=perfil.pk).datos
+        return perfil.conteo_cursos, [x["nombrecurso"] for x in doc["secciones"]["cursos"]]
+
+    def test_save_updates_count_and_document(self):
+        self.crear_curso(nombrecurso="Uno")
+        self.crear_curso(nombrecurso="Dos", fechainicio=date(2021, 1, 1))
+        self.assertEqual(self.visibles(self.perfil), (2, ["Dos", "Uno"]))
+
+        curso = Cursosrealizados.objects.get(nombrecurso="Uno")
+        curso.nombrecurso = "Uno editado"
+        self.guardar(curso)
+        self.assertEqual(self.visibles(self.perfil), (2, ["Dos", "Uno editado"]))
+
+    def test_hide_and_show(self):
+        curso = self.crear_curso()
+        curso.activarparaqueseveaenfront = False
+        self.guardar(curso)
+        self.assertEqual(self.visibles(self.perfil), (0, []))
+
+        curso.activarparaqueseveaenfront = True
+        self.guardar(curso)
+        self.assertEqual(self.visibles(self.perfil), (1, ["Django avanzado"]))
+
+    def test_delete(self):
+        curso = self.crear_curso()
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.delete()
+        self.assertEqual(self.visibles(self.perfil), (0, []))
+
+    def test_move_to_other_profile(self):
+        otro = self.crear_perfil(nombres="Otra", numerocedula="0912345678", perfilactivo=False)
+        curso = self.crear_curso()
+        curso.perfil = otro
+        self.guardar(curso)
+        self.assertEqual(self.visibles(self.perfil), (0, []))
+        self.assertEqual(self.visibles(otro), (1, ["Django avanzado"]))
+
+    def test_profile_cascade_delete(self):
+        self.crear_curso()
+        otro = self.crear_perfil(nombres="Otra", numerocedula="0912345678", perfilactivo=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.delete()
+        self.assertFalse(Documentoperfil.objects.filter(pk=self.perfil.pk).exists())
+        self.assertFalse(Cursosrealizados.objects.exists())
+        self.assertEqual(self.visibles(otro), (0, []))
+
+    def test_recount_command_repairs_dashboard(self):
+        self.crear_curso()
+        # Columna y documento desfasados, sin pasar por las señales
+        Datospersonales.objects.filter(pk=self.perfil.pk).update(conteo_cursos=7)
+        rebuild(self.perfil.pk)
+        perfil_activo.clear()
+        self.assertContains(self.client.get(reverse("home")), '<div class="sn">7</div>', html=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("recontar_visibles", stdout=io.StringIO())
+
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["counts"]["cursos"], 1)
+        self.assertNotContains(response, '<div class="sn">7</div>', html=True)
+
+
+class PaginasPublicasTests(LocalFilesMixin, TestCase):
+    # Página -> consultas: el documento de lectura y, en venta_garage, la
+    # consulta agrupada de las facetas
+    PAGINAS = {
+        "home": 1,
+        "datos_personales": 1,
+        "cursos": 1,
+        "experiencia": 1,
+        "productos_academicos": 1,
+        "productos_laborales": 1,
+        "reconocimientos": 1,
+        "venta_garage": 2,
+    }
+
+    def setUp(self):
+        super().setUp()
+        perfil = self.crear_perfil()
+        with self.captureOnCommitCallbacks(execute=True):
+            Cursosrealizados.objects.create(
+                perfil=perfil,
+                nombrecurso="Django avanzado",
+                fechainicio=date(2020, 6, 1),
+                fechafin=date(2020, 7, 15),
+            )
+            Ventagarage.objects.create(
+                perfil=perfil,
+                nombreproducto="Bicicleta",
+                estadoproducto="BUENO",
+                fecha=date(2021, 3, 1),
+            )
+        # Primera petición: lee el perfil activo y lo deja en el cache del proceso
+        self.client.get(reverse("home"))
+
+    def test_queries_per_page(self):
+        for nombre, consultas in self.PAGINAS.items():
+            with self.subTest(pagina=nombre), self.assertNumQueries(consultas):
+                response = self.client.get(reverse(nombre))
+                self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_counts_come_from_the_document(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["counts"]["cursos"], 1)
+        self.assertEqual(response.context["counts"]["venta"], 1)
+        self.assertEqual(response.context["counts"]["experiencias"], 0)
+
+
+@override_settings(CV_SECCION_PAGE_SIZE=2)
+class SeccionPaginadaTests(LocalFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        perfil = self.crear_perfil()
+        # Dos pares con la misma fecha: el desempate es por id
+        fechas = [date(2020, 1, 1), date(2021, 5, 1), date(2021, 5, 1), date(2019, 3, 1), date(2019, 3, 1)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, fecha in enumerate(fechas):
+                Cursosrealizados.objects.create(
+                    perfil=perfil,
+                    nombrecurso=f"Curso {i}",
+                    fechainicio=fecha,
+                    fechafin=fecha,
+                )
+            Cursosrealizados.objects.create(
+                perfil=perfil,
+                nombrecurso="Oculto",
+                fechainicio=date(2020, 6, 1),
+                fechafin=date(2020, 6, 1),
+                activarparaqueseveaenfront=False,
+            )
+
+    def test_walks_every_visible_item_once_in_order(self):
+        paginas = _recorrer(self.client, reverse("cursos"))
+        self.assertEqual([len(p) for p in paginas], [2, 2, 1])
+
+        vistos = [c.pk for pagina in paginas for c in pagina]
+        esperado = Cursosrealizados.objects.filter(activarparaqueseveaenfront=True).order_by("-fechainicio", "-pk")
+        self.assertEqual(vistos, [c.pk for c in esperado])
+        self.assertEqual(len(set(vistos)), 5)
+
+    def test_page_size_from_query(self):
+        paginas = _recorrer(self.client, reverse("cursos") + "?n=3")
+        self.assertEqual([len(p) for p in paginas], [3, 2])
+
+    def test_malformed_cursor_is_404(self):
+        for cursor in ("zz", "abc_1", "2020-01-01_x", "2020-13-01_1"):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("cursos"), {"despues": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CV_SECCION_PAGE_SIZE=2)
+class VentaGarageCatalogoTests(LocalFilesMixin, TestCase):
+    # (nombre, estado, precio); dos sin precio y un empate de precio
+    PRODUCTOS = (
+        ("Bicicleta", "BUENO", "20.00"),
+        ("Lámpara", "REGULAR", "5.00"),
+        ("Silla", "BUENO", None),
+        ("Mesa", "BUENO", "150.00"),
+        ("Radio", "REGULAR", None),
+        ("Libro", "BUENO", "5.00"),
+        ("Reloj", "REGULAR", "60.00"),
+    )
+
+    def setUp(self):
+        super().setUp()
+        perfil = self.crear_perfil()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, (nombre, estado, precio) in enumerate(self.PRODUCTOS):
+                Ventagarage.objects.create(
+                    perfil=perfil,
+                    nombreproducto=nombre,
+                    estadoproducto=estado,
+                    fecha=date(2021, 1, 1 + i),
+                    valordelbien=precio and Decimal(precio),
+                )
+
+    def _nombres(self, query):
+        paginas = _recorrer(self.client, reverse("venta_garage") + "?" + query)
+        nombres = [v.nombreproducto for pagina in paginas for v in pagina]
+        self.assertEqual(len(nombres), len(set(nombres)))
+        return nombres
+
+    def test_price_order_puts_missing_prices_last(self):
+        self.assertEqual(
+            self._nombres("orden=precio_asc"),
+            ["Lámpara", "Libro", "Bicicleta", "Reloj", "Mesa", "Silla", "Radio"],
+        )
+        self.assertEqual(
+            self._nombres("orden=precio_desc"),
+            ["Mesa", "Reloj", "Bicicleta", "Libro", "Lámpara", "Radio", "Silla"],
+        )
+
+    def test_date_orders(self):
+        nombres = [p[0] for p in self.PRODUCTOS]
+        self.assertEqual(self._nombres("orden=antiguos"), nombres)
+        self.assertEqual(self._nombres("orden=recientes"), nombres[::-1])
+
+    def test_filters_apply_on_every_page(self):
+        self.assertEqual(
+            self._nombres("orden=precio_asc&estado=BUENO"),
+            ["Libro", "Bicicleta", "Mesa", "Silla"],
+        )
+        self.assertEqual(
+            self._nombres("orden=precio_desc&precio=hasta-10&precio=sin-precio"),
+            ["Libro", "Lámpara", "Radio", "Silla"],
+        )
+        self.assertEqual(self._nombres("desde=2021-01-03&hasta=2021-01-05&orden=antiguos"), ["Silla", "Mesa", "Radio"])
+
+    def test_malformed_cursor_is_404(self):
+        for query in ({"orden": "precio_asc", "despues": "abc_1"}, {"orden": "antiguos", "despues": "zz"}):
+            with self.subTest(query=query):
+                response = self.client.get(reverse("venta_garage"), query)
+                self.assertEqual(response.status_code, 404)
+
+    def _facetas(self, query):
+        facetas = self.client.get(reverse("venta_garage") + "?" + query).context["facetas"]
+        return (
+            facetas["total"],
+            {f["clave"]: f["n"] for f in facetas["estado"]},
+            {f["clave"]: f["n"] for f in facetas["precio"]},
+        )
+
+    def test_facets_without_selection(self):
+        total, estado, precio = self._facetas("")
+        self.assertEqual(total, 7)
+        self.assertEqual(estado, {"BUENO": 4, "REGULAR": 3})
+        self.assertEqual(precio, {"hasta-10": 2, "10-50": 1, "50-100": 1, "mas-100": 1, "sin-precio": 2})
+
+    def test_each_facet_ignores_its_own_selection(self):
+        total, estado, precio = self._facetas("estado=BUENO&precio=sin-precio&precio=mas-100")
+        self.assertEqual(total, 2)
+        # Estado: con el filtro de precio, sin el suyo
+        self.assertEqual(estado, {"BUENO": 2, "REGULAR": 1})
+        # Precio: con el filtro de estado, sin el suyo
+        self.assertEqual(precio, {"hasta-10": 1, "10-50": 1, "50-100": 0, "mas-100": 1, "sin-precio": 1})
 
-# Create your tests here.
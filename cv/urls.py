@@ -11,10 +11,14 @@ urlpatterns = [
     path("reconocimientos/", views.reconocimientos, name="reconocimientos"),
     path("venta-garage/", views.venta_garage, name="venta_garage"),
     path("imprimir/", views.imprimir_hoja_vida, name="imprimir_hoja_vida"),
+    path("imprimir/trabajos/", views.crear_trabajo_pdf, name="crear_trabajo_pdf"),
+    path("imprimir/trabajos/<str:job_id>/", views.estado_trabajo_pdf, name="estado_trabajo_pdf"),
+    path("imprimir/descargar/<str:token>/", views.descargar_trabajo_pdf, name="descargar_trabajo_pdf"),
     path(
         "ver-certificado/<str:tipo>/<int:obj_id>/",
         views.ver_certificado_pdf,
         name="ver_certificado_pdf"
     ),
+    path("certificados.zip", views.descargar_certificados, name="descargar_certificados"),
 
 ]
@@ -0,0 +1,150 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from .models import Ventagarage
+from .paginacion import keyset_page, page_size
+
+# Rangos de precio: (clave, etiqueta, desde incluido, hasta excluido)
+RANGOS_PRECIO = (
+    ("hasta-10", "Hasta $10", None, Decimal("10")),
+    ("10-50", "$10 a $50", Decimal("10"), Decimal("50")),
+    ("50-100", "$50 a $100", Decimal("50"), Decimal("100")),
+    ("mas-100", "Más de $100", Decimal("100"), None),
+)
+SIN_PRECIO = ("sin-precio", "Sin precio")
+
+# Orden del catálogo -> orden estable para el cursor
+ORDENES = {
+    "recientes": ("-fecha", "-pk"),
+    "antiguos": ("fecha", "pk"),
+    "precio_asc": ("valordelbien", "pk"),
+    "precio_desc": ("-valordelbien", "-pk"),
+}
+ORDEN_POR_DEFECTO = "recientes"
+
+ORDEN_CHOICES = (
+    ("recientes", "Más recientes"),
+    ("antiguos", "Más antiguos"),
+    ("precio_asc", "Precio: menor a mayor"),
+    ("precio_desc", "Precio: mayor a menor"),
+)
+
+
+# =========================
+# FILTROS DE LA URL
+# =========================
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_filtros(params):
+    # Los valores desconocidos o mal formados se ignoran, como en un formulario
+    estados = {k for k, _label in Ventagarage.ESTADO_PRODUCTO_CHOICES}
+    rangos = {r[0] for r in RANGOS_PRECIO} | {SIN_PRECIO[0]}
+    orden = params.get("orden")
+    return {
+        "estado": [e for e in params.getlist("estado") if e in estados],
+        "precio": [p for p in params.getlist("precio") if p in rangos],
+        "desde": _parse_date(params.get("desde")),
+        "hasta": _parse_date(params.get("hasta")),
+        "orden": orden if orden in ORDENES else ORDEN_POR_DEFECTO,
+    }
+
+
+def is_default(filtros):
+    return not (filtros["estado"] or filtros["precio"] or filtros["desde"] or filtros["hasta"]) and (
+        filtros["orden"] == ORDEN_POR_DEFECTO
+    )
+
+
+# =========================
+# CONSULTAS
+# =========================
+def _base(perfil_id, filtros):
+    # Lo que no es faceta: perfil, visibles y ventana de fechas
+    qs = Ventagarage.objects.filter(perfil_id=perfil_id, activarparaqueseveaenfront=True)
+    if filtros["desde"]:
+        qs = qs.filter(fecha__gte=filtros["desde"])
+    if filtros["hasta"]:
+        qs = qs.filter(fecha__lte=filtros["hasta"])
+    return qs
+
+
+def _rango_q(clave):
+    if clave == SIN_PRECIO[0]:
+        return Q(valordelbien__isnull=True)
+    for key, _label, desde, hasta in RANGOS_PRECIO:
+        if key == clave:
+            q = Q(valordelbien__isnull=False)
+            if desde is not None:
+                q &= Q(valordelbien__gte=desde)
+            if hasta is not None:
+                q &= Q(valordelbien__lt=hasta)
+            return q
+    raise KeyError(clave)
+
+
+def _rango_case():
+    whens = [When(valordelbien__isnull=True, then=Value(SIN_PRECIO[0]))]
+    whens += [When(_rango_q(key), then=Value(key)) for key, _l, _d, _h in RANGOS_PRECIO]
+    return Case(*whens, output_field=CharField())
+
+
+def catalog_page(perfil_id, filtros, params):
+    """(ítems, cursor siguiente o None) del catálogo filtrado y ordenado."""
+    qs = _base(perfil_id, filtros)
+    if filtros["estado"]:
+        qs = qs.filter(estadoproducto__in=filtros["estado"])
+    if filtros["precio"]:
+        q = Q()
+        for clave in filtros["precio"]:
+            q |= _rango_q(clave)
+        qs = qs.filter(q)
+    return keyset_page(qs, ORDENES[filtros["orden"]], params.get("despues"), page_size(params))
+
+
+def facet_counts(perfil_id, filtros):
+    """
+    Conteos por estado y por rango de precio con una sola consulta
+    agrupada por (estado, rango). Cada faceta cuenta con los demás filtros
+    aplicados pero no con el suyo, así se ve cuánto añade cada opción.
+    """
+    rows = (
+        _base(perfil_id, filtros)
+        .annotate(rango=_rango_case())
+        .values("estadoproducto", "rango")
+        .annotate(n=Count("*"))
+        .order_by()
+    )
+
+    estados_sel = set(filtros["estado"])
+    precios_sel = set(filtros["precio"])
+    por_estado = {}
+    por_rango = {}
+    total = 0
+    for row in rows:
+        estado_ok = not estados_sel or row["estadoproducto"] in estados_sel
+        rango_ok = not precios_sel or row["rango"] in precios_sel
+        if rango_ok:
+            por_estado[row["estadoproducto"]] = por_estado.get(row["estadoproducto"], 0) + row["n"]
+        if estado_ok:
+            por_rango[row["rango"]] = por_rango.get(row["rango"], 0) + row["n"]
+        if estado_ok and rango_ok:
+            total += row["n"]
+
+    return {
+        "total": total,
+        "estado": [
+            {"clave": k, "etiqueta": label, "n": por_estado.get(k, 0), "activo": k in estados_sel}
+            for k, label in Ventagarage.ESTADO_PRODUCTO_CHOICES
+        ],
+        "precio": [
+            {"clave": k, "etiqueta": label, "n": por_rango.get(k, 0), "activo": k in precios_sel}
+            for k, label in [(r[0], r[1]) for r in RANGOS_PRECIO] + [SIN_PRECIO]
+        ],
+    }
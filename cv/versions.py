@@ -0,0 +1,46 @@
+import hashlib
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from .disk_cache import atomic_write
+
+# Modelos cuyo contenido aparece en la hoja de vida.
+MODELOS_CV = (
+    "datospersonales",
+    "cursosrealizados",
+    "experiencialaboral",
+    "productosacademicos",
+    "productoslaborales",
+    "reconocimientos",
+    "ventagarage",
+)
+
+# Sello de las columnas conteo_* de Datospersonales (cv/conteos.py). No está
+# en MODELOS_CV: los conteos no aparecen en el PDF.
+SELLO_CONTEOS = "conteos"
+
+
+# =========================
+# SELLOS DE VERSIÓN
+# =========================
+# Un archivo por modelo dentro de CV_CACHE_DIR: todos los workers del host
+# ven el mismo sello, y cualquier save/delete lo cambia (ver signals.py).
+def _version_path(model_name):
+    return Path(settings.CV_CACHE_DIR) / "versiones" / model_name
+
+
+def bump_version(model_name):
+    atomic_write(_version_path(model_name), uuid.uuid4().hex.encode())
+
+
+def get_version(*model_names):
+    h = hashlib.sha256()
+    for name in model_names or MODELOS_CV:
+        try:
+            stamp = _version_path(name).read_bytes()
+        except FileNotFoundError:
+            stamp = b"0"
+        h.update(name.encode() + b"=" + stamp + b";")
+    return h.hexdigest()[:16]
@@ -1,123 +1,110 @@
 # cv/views.py
-import io
-import requests
-
-from django.http import HttpResponse, HttpResponseForbidden, Http404
-from django.shortcuts import render, get_object_or_404, redirect
-from django.template.loader import render_to_string
+import os
+import time
+
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseGone,
+    Http404,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import render, redirect
 from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_POST
+
+from .models import Ventagarage
+from . import pdf_jobs, render_pool, venta
+from .attachments import open_file
+from .certificados import TIPOS, find_certificado, iter_zip, zip_entries
+from .http_ranges import file_etag, not_modified, ranged_file_response
+from .pdf_build import PDF_RENDERERS, estimate_attachments
+from .pdf_cache import get_or_render
+from .perfil_activo import get_perfil_activo
+from .paginacion import section_page
+from .read_model import load_documento
+from .render_pool import RenderCrashed, RenderPoolBusy
 
-from weasyprint import HTML
-
-# ✅ Para unir PDFs reales al final
-from PyPDF2 import PdfReader, PdfWriter
-
-from .models import (
-    Datospersonales,
-    Cursosrealizados,
-    Experiencialaboral,
-    Productosacademicos,
-    Productoslaborales,
-    Reconocimientos,
-    Ventagarage,
-)
 
 # =========================
 # HELPERS
 # =========================
 def _get_perfil_activo():
-    return Datospersonales.objects.filter(perfilactivo=True).order_by("-idperfil").first()
-
-
-def _read_pdf_bytes(file_field):
-    if not file_field:
-        return None
-    try:
-        if hasattr(file_field, "url"):
-            resp = requests.get(file_field.url, timeout=25)
-            resp.raise_for_status()
-            return resp.content
-        file_field.open("rb")
-        return file_field.read()
-    except Exception:
-        return None
-    finally:
-        try:
-            file_field.close()
-        except Exception:
-            pass
-
+    return get_perfil_activo()
 
-def _collect_pdfs(perfil, show):
-    pdfs = []
 
-    def add_pdf(field):
-        b = _read_pdf_bytes(field)
-        if b:
-            pdfs.append(b)
-
-    if show.get("cursos"):
-        for x in perfil.cursos.filter(activarparaqueseveaenfront=True):
-            if x.certificado_pdf:
-                add_pdf(x.certificado_pdf)
-
-    if show.get("exp"):
-        for x in perfil.experiencias.filter(activarparaqueseveaenfront=True):
-            if x.certificado_pdf:
-                add_pdf(x.certificado_pdf)
-
-    if show.get("reconoc"):
-        for x in perfil.reconocimientos.filter(activarparaqueseveaenfront=True):
-            if x.certificado_pdf:
-                add_pdf(x.certificado_pdf)
-
-    if show.get("prod_acad"):
-        for x in perfil.productos_academicos.filter(activarparaqueseveaenfront=True):
-            if x.certificado_pdf:
-                add_pdf(x.certificado_pdf)
+def _get_documento_activo():
+    # Perfil activo con sus secciones visibles, desde su documento de lectura
+    perfil = _get_perfil_activo()
+    return load_documento(perfil) if perfil else None
 
-    if show.get("prod_lab"):
-        for x in perfil.productos_laborales.filter(activarparaqueseveaenfront=True):
-            if x.certificado_pdf:
-                add_pdf(x.certificado_pdf)
 
-    return pdfs
+def _parse_show(params):
+    # "motor" no cuenta como selección de secciones
+    qs = params.copy()
+    qs.pop("csrfmiddlewaretoken", None)
+    motor = qs.pop("motor", [settings.CV_PDF_RENDERER])[-1]
+    show = {
+        "exp": "exp" in qs or not qs,
+        "cursos": "cursos" in qs or not qs,
+        "reconoc": "reconoc" in qs or not qs,
+        "prod_acad": "prod_acad" in qs or not qs,
+        "prod_lab": "prod_lab" in qs or not qs,
+    }
 
+    if motor not in PDF_RENDERERS:
+        motor = settings.CV_PDF_RENDERER
 
-def _merge_pdfs(base_pdf_bytes, attachments_bytes_list):
-    writer = PdfWriter()
+    return show, motor
 
-    base_reader = PdfReader(io.BytesIO(base_pdf_bytes))
-    for p in base_reader.pages:
-        writer.add_page(p)
 
-    for pdf_bytes in attachments_bytes_list:
+# =========================
+# VIEWS WEB
+# =========================
+def _page_links(request, siguiente):
+    # Enlaces por cursor (?despues=) que conservan el resto de parámetros
+    links = {"siguiente_url": None, "primera_url": None}
+    params = request.GET.copy()
+    if siguiente:
+        params["despues"] = siguiente
+        links["siguiente_url"] = "?" + params.urlencode()
+    if "despues" in request.GET:
+        params.pop("despues", None)
+        links["primera_url"] = "?" + params.urlencode()
+    return links
+
+
+def _render_seccion(request, key, template):
+    perfil = _get_documento_activo()
+    context = {"perfil": perfil, "items": [], **_page_links(request, None)}
+    if perfil:
         try:
-            r = PdfReader(io.BytesIO(pdf_bytes))
-            for p in r.pages:
-                writer.add_page(p)
-        except Exception:
-            continue
+            items, siguiente = section_page(perfil, key, request.GET)
+        except ValueError:
+            raise Http404("Página inválida")
+        context["items"] = items
+        context.update(_page_links(request, siguiente))
 
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
+    return render(request, template, context)
 
 
-# =========================
-# VIEWS WEB
-# =========================
 def home(request):
-    perfil = _get_perfil_activo()
+    perfil = _get_documento_activo()
     permitir_impresion = bool(perfil and perfil.permitir_impresion)
 
+    # Columnas mantenidas por signals (cv/conteos.py), ya dentro del documento
     counts = {
-        "cursos": perfil.cursos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-        "experiencias": perfil.experiencias.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-        "prod_acad": perfil.productos_academicos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-        "prod_lab": perfil.productos_laborales.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-        "reconoc": perfil.reconocimientos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-        "venta": perfil.venta_garage.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
+        "cursos": perfil.conteo_cursos if perfil else 0,
+        "experiencias": perfil.conteo_experiencias if perfil else 0,
+        "prod_acad": perfil.conteo_prod_acad if perfil else 0,
+        "prod_lab": perfil.conteo_prod_lab if perfil else 0,
+        "reconoc": perfil.conteo_reconoc if perfil else 0,
+        "venta": perfil.conteo_venta if perfil else 0,
     }
 
     return render(request, "home.html", {
@@ -128,104 +115,196 @@ def home(request):
 
 
 def datos_personales(request):
-    perfil = _get_perfil_activo()
+    perfil = _get_documento_activo()
     return render(request, "secciones/datos_personales.html", {"perfil": perfil})
 
 
 def cursos(request):
-    perfil = _get_perfil_activo()
-    items = perfil.cursos.filter(activarparaqueseveaenfront=True) if perfil else []
-    return render(request, "secciones/cursos.html", {"perfil": perfil, "items": items})
+    return _render_seccion(request, "cursos", "secciones/cursos.html")
 
 
 def experiencia(request):
-    perfil = _get_perfil_activo()
-    items = perfil.experiencias.filter(activarparaqueseveaenfront=True) if perfil else []
-    return render(request, "secciones/experiencia.html", {"perfil": perfil, "items": items})
+    return _render_seccion(request, "exp", "secciones/experiencia.html")
 
 
 def productos_academicos(request):
-    perfil = _get_perfil_activo()
-    items = perfil.productos_academicos.filter(activarparaqueseveaenfront=True) if perfil else []
-    return render(request, "secciones/productos_academicos.html", {"perfil": perfil, "items": items})
+    return _render_seccion(request, "prod_acad", "secciones/productos_academicos.html")
 
 
 def productos_laborales(request):
-    perfil = _get_perfil_activo()
-    items = perfil.productos_laborales.filter(activarparaqueseveaenfront=True) if perfil else []
-    return render(request, "secciones/productos_laborales.html", {"perfil": perfil, "items": items})
+    return _render_seccion(request, "prod_lab", "secciones/productos_laborales.html")
 
 
 def reconocimientos(request):
-    perfil = _get_perfil_activo()
-    items = perfil.reconocimientos.filter(activarparaqueseveaenfront=True) if perfil else []
-    return render(request, "secciones/reconocimientos.html", {"perfil": perfil, "items": items})
+    return _render_seccion(request, "reconoc", "secciones/reconocimientos.html")
 
 
 def venta_garage(request):
-    perfil = _get_perfil_activo()
-    items = perfil.venta_garage.filter(activarparaqueseveaenfront=True) if perfil else []
-    return render(request, "secciones/venta_garage.html", {"perfil": perfil, "items": items})
+    perfil = _get_documento_activo()
+    context = {"perfil": perfil, "items": [], **_page_links(request, None)}
+    if perfil:
+        filtros = venta.parse_filtros(request.GET)
+        try:
+            if venta.is_default(filtros):
+                items, siguiente = section_page(perfil, "venta", request.GET)
+            else:
+                items, siguiente = venta.catalog_page(perfil.pk, filtros, request.GET)
+        except ValueError:
+            raise Http404("Página inválida")
+
+        context.update(
+            items=items,
+            filtros=filtros,
+            facetas=venta.facet_counts(perfil.pk, filtros),
+            ordenes=venta.ORDEN_CHOICES,
+            **_page_links(request, siguiente),
+        )
+
+    return render(request, "secciones/venta_garage.html", context)
 
 
 # =========================
 # PDF FINAL DEL CV + ADJUNTOS
 # =========================
+def _retry_later(message):
+    response = HttpResponse(message, status=503)
+    response["Retry-After"] = str(settings.CV_PDF_RETRY_AFTER)
+    return response
+
+
 def imprimir_hoja_vida(request):
     perfil = _get_perfil_activo()
     if not perfil or not perfil.permitir_impresion:
         return HttpResponseForbidden()
 
-    qs = request.GET
-    show = {
-        "exp": "exp" in qs or not qs,
-        "cursos": "cursos" in qs or not qs,
-        "reconoc": "reconoc" in qs or not qs,
-        "prod_acad": "prod_acad" in qs or not qs,
-        "prod_lab": "prod_lab" in qs or not qs,
-    }
+    show, motor = _parse_show(request.GET)
+    base_url = request.build_absolute_uri()
+    # Un solo plazo para toda la petición (espera al render idéntico, al
+    # cupo y a los adjuntos), por debajo del timeout del worker de gunicorn
+    deadline = time.monotonic() + settings.CV_PDF_DEADLINE
+
+    def build():
+        return render_pool.render(perfil, show, motor, base_url, deadline)
+
+    try:
+        final_pdf = get_or_render(perfil, show, build, motor, deadline)
+    except RenderCrashed:
+        # El proceso de render ya se reemplazó: el reintento usa uno nuevo
+        return _retry_later("No se pudo generar el PDF. Intenta de nuevo en unos segundos.")
+    except RenderPoolBusy:
+        # Cola llena: el cliente reintenta más tarde
+        return _retry_later("Hay demasiadas impresiones en curso. Intenta de nuevo en unos segundos.")
+
+    # Por bloques, con Range para que el visor pida la primera página antes
+    return ranged_file_response(
+        request,
+        final_pdf,
+        content_type="application/pdf",
+        filename="hoja_de_vida.pdf",
+        etag=file_etag(final_pdf),
+    )
+
+
+# =========================
+# PDF EN SEGUNDO PLANO: CREAR, CONSULTAR, DESCARGAR
+# =========================
+@require_POST
+def crear_trabajo_pdf(request):
+    perfil = _get_perfil_activo()
+    if not perfil or not perfil.permitir_impresion:
+        return HttpResponseForbidden()
 
-    html = render_to_string(
-        "pdf/cv.html",
+    show, motor = _parse_show(request.POST)
+    # base_url de la página de impresión, igual que la petición directa
+    base_url = request.build_absolute_uri(reverse("imprimir_hoja_vida"))
+    job_id = pdf_jobs.submit(perfil, show, motor, base_url)
+
+    return JsonResponse(
         {
-            "perfil": perfil,
-            "show": show,
-        }
+            "id": job_id,
+            "estado_url": reverse("estado_trabajo_pdf", args=[job_id]),
+            "adjuntos": estimate_attachments(perfil, show),
+        },
+        status=202,
     )
 
-    base_pdf = HTML(
-        string=html,
-        base_url=request.build_absolute_uri()
-    ).write_pdf()
 
-    attachments = _collect_pdfs(perfil, show)
+def estado_trabajo_pdf(request, job_id):
+    if not pdf_jobs.JOB_ID_RE.match(job_id):
+        raise Http404("Trabajo inválido")
 
-    final_pdf = _merge_pdfs(base_pdf, attachments) if attachments else base_pdf
+    data = pdf_jobs.status(job_id)
+    if data is None:
+        raise Http404("Trabajo no encontrado")
 
-    response = HttpResponse(final_pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'inline; filename="hoja_de_vida.pdf"'
-    return response
+    token = data.pop("token", None)
+    if token:
+        data["descarga_url"] = reverse("descargar_trabajo_pdf", args=[token])
+    return JsonResponse(data)
+
+
+def descargar_trabajo_pdf(request, token):
+    try:
+        f = pdf_jobs.open_download(token)
+    except signing.BadSignature:
+        return HttpResponseGone("El enlace de descarga caducó.")
+
+    if f is None:
+        return HttpResponseGone("El PDF ya no está disponible.")
+
+    return ranged_file_response(
+        request,
+        f,
+        content_type="application/pdf",
+        filename="hoja_de_vida.pdf",
+        etag=file_etag(f),
+    )
 
 
 # =========================
 # VISOR PDF INDIVIDUAL
 # =========================
 def ver_certificado_pdf(request, tipo, obj_id):
-    MAP = {
-        "curso": (Cursosrealizados, "idcursorealizado"),
-        "experiencia": (Experiencialaboral, "idexperiencialaboral"),
-        "reconocimiento": (Reconocimientos, "idreconocimiento"),
-        "prod_acad": (Productosacademicos, "idproductoacademico"),
-        "prod_lab": (Productoslaborales, "idproductolaboral"),
-    }
-
-    if tipo not in MAP:
+    if tipo not in TIPOS:
         raise Http404("Tipo de certificado inválido")
 
-    model, field = MAP[tipo]
-    obj = get_object_or_404(model, **{field: obj_id})
+    ref = find_certificado(tipo, obj_id)
+    if ref is None:
+        raise Http404("No existe el registro")
 
-    if not getattr(obj, "certificado_pdf", None):
+    archivo, sha = ref
+    if not archivo:
         raise Http404("Este registro no tiene PDF")
 
-    return redirect(obj.certificado_pdf.url)
+    if not settings.CV_CERTIFICADO_PROXY:
+        return redirect(archivo.url)
+
+    # Modo proxy: desde el cache local, con ETag fuerte (hash) y Range
+    response = not_modified(request, sha)
+    if response is None:
+        f = open_file(archivo)
+        if f is None:
+            return redirect(archivo.url)
+        response = ranged_file_response(
+            request,
+            f,
+            content_type="application/pdf",
+            filename=os.path.basename(archivo.name),
+            etag=sha,
+        )
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+# =========================
+# ZIP CON TODOS LOS CERTIFICADOS
+# =========================
+def descargar_certificados(request):
+    perfil = _get_perfil_activo()
+    if not perfil:
+        raise Http404("No hay perfil activo")
+
+    # Se envía mientras se arma: sin Content-Length y sin cargarlo en memoria
+    response = StreamingHttpResponse(iter_zip(zip_entries(perfil)), content_type="application/zip")
+    response["Content-Disposition"] = content_disposition_header(True, "certificados.zip")
+    return response
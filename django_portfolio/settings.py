@@ -170,6 +170,70 @@ else:
         },
     }
 
+# =====================
+# PDF DE LA HOJA DE VIDA
+# =====================
+# Motor por defecto: "weasyprint" (plantilla HTML) o "reportlab" (dibujo directo);
+# se puede elegir por petición con ?motor=
+CV_PDF_RENDERER = os.getenv("CV_PDF_RENDERER", "weasyprint")
+
+# Carpeta con las fuentes .ttf/.otf de WeasyPrint; por defecto DejaVu Sans incluida en
+# cv/static/fonts, así el PDF no depende de las fuentes instaladas en el servidor
+CV_PDF_FONTS_DIR = Path(os.getenv("CV_PDF_FONTS_DIR") or BASE_DIR / "cv" / "static" / "fonts")
+
+# Memoria para imágenes/estáticos que WeasyPrint lee del storage (por proceso)
+CV_PDF_ASSET_CACHE_MAX_BYTES = int(os.getenv("CV_PDF_ASSET_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+# Segundos que cada proceso reutiliza el perfil activo sin consultarlo (los cambios se
+# notan antes: cada save/delete cambia su sello de versión)
+CV_PERFIL_CACHE_TTL = float(os.getenv("CV_PERFIL_CACHE_TTL", 30))
+
+# Ítems por página en las secciones públicas (?n= permite hasta el máximo)
+CV_SECCION_PAGE_SIZE = int(os.getenv("CV_SECCION_PAGE_SIZE", 20))
+CV_SECCION_MAX_PAGE_SIZE = int(os.getenv("CV_SECCION_MAX_PAGE_SIZE", 100))
+
+# Cache en disco, compartido por todos los workers del host
+CV_CACHE_DIR = Path(os.getenv("CV_CACHE_DIR", BASE_DIR / "cache"))
+CV_PDF_CACHE_MAX_BYTES = int(os.getenv("CV_PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+# Descarga de certificados adjuntos al PDF
+CV_PDF_FETCH_CONCURRENCY = int(os.getenv("CV_PDF_FETCH_CONCURRENCY", 8))
+CV_PDF_FETCH_PER_HOST = int(os.getenv("CV_PDF_FETCH_PER_HOST", 8))
+# Cache local de certificados: tamaño máximo y segundos antes de revalidar (ETag)
+CV_ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv("CV_ATTACHMENT_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+CV_ATTACHMENT_CACHE_FRESH = int(os.getenv("CV_ATTACHMENT_CACHE_FRESH", 3600))
+# Workers sync de gunicorn (gunicorn.conf.py lee la misma variable)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 3))
+# Impresiones simultáneas en el host y cuántas pueden esperar turno; el resto recibe
+# 503 con Retry-After. Cada una ocupa un worker mientras dura, así que entre las dos
+# se limitan a WEB_CONCURRENCY - 1. Cada cupo es un proceso hijo (~memoria de un
+# WeasyPrint) del único proceso de render del host; también: tareas por hijo antes
+# de reciclarlo
+CV_PDF_RENDER_SLOTS = int(os.getenv("CV_PDF_RENDER_SLOTS", 1))
+CV_PDF_RENDER_QUEUE = int(os.getenv("CV_PDF_RENDER_QUEUE", 1))
+CV_PDF_RENDER_MAX_TASKS = int(os.getenv("CV_PDF_RENDER_MAX_TASKS", 50))
+CV_PDF_RETRY_AFTER = int(os.getenv("CV_PDF_RETRY_AFTER", 10))
+# Segundos de validez del enlace de descarga de un PDF generado en segundo plano
+CV_PDF_JOB_TTL = int(os.getenv("CV_PDF_JOB_TTL", 15 * 60))
+# Segundos que una petición espera al render idéntico en curso antes de generar por su cuenta
+CV_PDF_SINGLEFLIGHT_TIMEOUT = float(os.getenv("CV_PDF_SINGLEFLIGHT_TIMEOUT", 30))
+# Optimización del PDF unido: "fast" solo evita adjuntos repetidos; "small" además
+# une objetos idénticos (fuentes, logos) y comprime los contenidos de página
+CV_PDF_OPTIMIZE = os.getenv("CV_PDF_OPTIMIZE", "fast")
+# PDF linealizado para que el navegador muestre la primera página antes de terminar
+# de descargar ("1" para activar; requiere pikepdf)
+CV_PDF_LINEARIZE = os.getenv("CV_PDF_LINEARIZE", "0") == "1"
+# Tamaño a partir del cual el PDF unido se escribe a disco en vez de memoria
+CV_PDF_SPOOL_MAX_BYTES = int(os.getenv("CV_PDF_SPOOL_MAX_BYTES", 8 * 1024 * 1024))
+# Segundos totales para generar el PDF; al agotarse se omiten los adjuntos pendientes
+CV_PDF_DEADLINE = float(os.getenv("CV_PDF_DEADLINE", 20))
+# Servir los certificados a través de la app (cache local, ETag y Range) en vez de
+# redirigir al storage ("1" para activar)
+CV_CERTIFICADO_PROXY = os.getenv("CV_CERTIFICADO_PROXY", "0") == "1"
+# Guardar además una copia comprimida y linealizada de cada certificado al subirlo
+# ("1" para activar; requiere pikepdf)
+CV_CERTIFICADO_OPTIMIZAR = os.getenv("CV_CERTIFICADO_OPTIMIZAR", "0") == "1"
+
 # =====================
 # DEFAULT PRIMARY KEY
 # =====================
@@ -0,0 +1,27 @@
+# gunicorn lee este archivo automáticamente desde el directorio de trabajo.
+import os
+
+# Igual que WEB_CONCURRENCY en settings.py: los cupos de impresión dejan
+# siempre uno de estos workers libre para las páginas HTML
+workers = int(os.getenv("WEB_CONCURRENCY", 3))
+
+_render_server = None
+
+
+def on_starting(server):
+    # Un solo proceso de render para todo el host, compartido por los workers
+    # (cv/render_pool.py); precalienta WeasyPrint fuera de una petición real
+    global _render_server
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_portfolio.settings")
+    from cv.render_pool import start_server
+
+    try:
+        _render_server = start_server()
+    except Exception:
+        server.log.exception("No se pudo arrancar el proceso de render")
+
+
+def on_exit(server):
+    if _render_server is not None:
+        _render_server.terminate()
+        _render_server.join(5)